@@ -13,6 +13,11 @@ DBT_PROJECT_DIR = os.path.join(PROJECT_ROOT, "app_dbt")
 WAREHOUSE_DIR = os.path.join(PROJECT_ROOT, "warehouse")
 SCRIPT_MYSQL = os.path.join(PROJECT_ROOT, "scripts", "ingest_apps_to_mysql.py")
 SCRIPT_MONGO = os.path.join(PROJECT_ROOT, "scripts", "ingest_reviews_to_mongodb.py")
+SCRIPT_APP_INDEX = os.path.join(PROJECT_ROOT, "scripts", "build_app_name_index.py")
+SCRIPT_KPI_SKETCHES = os.path.join(PROJECT_ROOT, "scripts", "kpi_sketches.py")
+SCRIPT_DUCKDB_PROFILE = os.path.join(PROJECT_ROOT, "scripts", "duckdb_profile.py")
+SCRIPT_STAGE_CACHE = os.path.join(PROJECT_ROOT, "scripts", "stage_cache.py")
+STAGE_CACHE_CMD = f'"{VENV_PYTHON_BIN}" "{SCRIPT_STAGE_CACHE}"'
 
 default_args = {
     'owner': 'airflow',
@@ -32,26 +37,47 @@ with DAG(
 
     task_ingest_mysql = BashOperator(
         task_id='ingest_apps_to_mysql',
-        bash_command=f'"{VENV_PYTHON_BIN}" "{SCRIPT_MYSQL}"',
+        # Skipped by the stage cache when the CSV and script are unchanged since the last success
+        bash_command=f'{STAGE_CACHE_CMD} run ingest_apps -- "{VENV_PYTHON_BIN}" "{SCRIPT_MYSQL}"',
     )
 
     task_ingest_mongo_and_seed = BashOperator(
         task_id='ingest_reviews_to_mongo_and_seed',
-        bash_command=f'"{VENV_PYTHON_BIN}" "{SCRIPT_MONGO}"',
+        bash_command=f'{STAGE_CACHE_CMD} run ingest_reviews -- "{VENV_PYTHON_BIN}" "{SCRIPT_MONGO}"',
+    )
+
+    # Needs both seeds: maps review app names to the integer app_key used by the dbt joins
+    task_build_app_index = BashOperator(
+        task_id='build_app_name_index',
+        bash_command=f'{STAGE_CACHE_CMD} run build_app_name_index -- "{VENV_PYTHON_BIN}" "{SCRIPT_APP_INDEX}"',
     )
 
     task_dbt_run = BashOperator(
         task_id='run_dbt_models',
         # --- FINAL COMMAND: Activate venv before running dbt seed and run ---
+        # Skipped entirely when seeds/models are unchanged; otherwise only state:modified+ plus changed seeds (by name) is rebuilt
         bash_command=(
             f'source {VENV_PATH}/bin/activate && ' # Activate the virtual environment
             f'mkdir -p "{WAREHOUSE_DIR}" && '
+            f'if {STAGE_CACHE_CMD} check dbt_build; then echo "dbt_build is up to date, skipping."; else '
+            f'DBT_STATE_ARGS="$({STAGE_CACHE_CMD} dbt-args)" && '
+            # Batch DuckDB profile (threads, memory cap, spill directory) read by profiles.yml
+            f'eval "$("{VENV_PYTHON_BIN}" "{SCRIPT_DUCKDB_PROFILE}" batch)" && '
             f'cd "{DBT_PROJECT_DIR}" && '
             # Run dbt seed using the venv dbt
-            f'"{DBT_BIN}" seed --project-dir . --profiles-dir . && '
+            f'"{DBT_BIN}" seed --project-dir . --profiles-dir . $DBT_STATE_ARGS && '
             # Run dbt run using the venv dbt
-            f'"{DBT_BIN}" run --project-dir . --profiles-dir .'
+            f'"{DBT_BIN}" run --project-dir . --profiles-dir . $DBT_STATE_ARGS && '
+            # Keep the manifest for the next state comparison and mark the stage as fresh
+            f'{STAGE_CACHE_CMD} save-dbt-state && '
+            f'{STAGE_CACHE_CMD} record dbt_build; fi'
         ),
     )
 
-    [task_ingest_mysql, task_ingest_mongo_and_seed] >> task_dbt_run
\ No newline at end of file
+    # Folds new stg_apps rows into the per-category KPI sketches used by the dashboard cards
+    task_kpi_sketches = BashOperator(
+        task_id='update_kpi_sketches',
+        bash_command=f'{STAGE_CACHE_CMD} run build_kpi_sketches -- "{VENV_PYTHON_BIN}" "{SCRIPT_KPI_SKETCHES}"',
+    )
+
+    [task_ingest_mysql, task_ingest_mongo_and_seed] >> task_build_app_index >> task_dbt_run >> task_kpi_sketches
\ No newline at end of file
@@ -8,6 +8,7 @@ SELECT
     -- Generate a surrogate key for the app dimension
     md5(cast(coalesce(cast(app_name as TEXT), '_') || coalesce(cast(current_version as TEXT), '_') as TEXT)) as app_id, 
     app_name,
+    app_key, -- integer key shared with stg_reviews
     -- developer_name is not available from stg_apps based on current structure, remove or add to stg_apps
     app_size_bytes,
     app_price,
@@ -21,6 +22,7 @@ SELECT
 FROM {{ ref('stg_apps') }}
 GROUP BY 
     app_name,
+    app_key,
     app_size_bytes,
     app_price,
     content_rating,
@@ -7,6 +7,7 @@
 WITH apps AS (
     SELECT
         app_id,
+        app_key,
         app_name,
         app_price,
         content_rating,
@@ -25,7 +26,7 @@ categories AS (
 
 reviews AS (
     SELECT
-        app_name,
+        app_key,
         -- ✅ تحويل النص إلى قيمة رقمية قبل الحساب
         AVG(
             CASE
@@ -37,11 +38,13 @@ reviews AS (
         ) AS avg_sentiment,
         COUNT(*) AS total_reviews
     FROM {{ ref('stg_reviews') }}
-    GROUP BY app_name
+    WHERE app_key IS NOT NULL
+    GROUP BY app_key
 )
 
 SELECT
     a.app_id,
+    a.app_key,
     a.app_name,
     c.app_category,
     c.app_genres,
@@ -55,4 +58,4 @@ FROM apps a
 LEFT JOIN categories c 
     ON a.app_name = c.app_genres
 LEFT JOIN reviews r 
-    ON a.app_name = r.app_name
+    ON a.app_key = r.app_key
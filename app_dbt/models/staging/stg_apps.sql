@@ -14,6 +14,8 @@ cleaned AS (
     SELECT
         -- Standardize column names (Ensure these match the columns in apps_from_mysql.csv)
         "App" AS app_name,
+        -- Integer key from the normalized app-name index (scripts/build_app_name_index.py)
+        idx.app_key,
         "Category" AS app_category,
         -- Rating is already FLOAT NULL from Python script
         "Rating" AS app_rating,
@@ -34,12 +36,16 @@ cleaned AS (
 
     FROM
         source
+    LEFT JOIN {{ ref('app_name_index') }} idx
+        ON source."App" = idx.raw_name
+        AND idx.match_type <> 'retired' -- kept only to reserve the keys of removed apps
     WHERE
         "App" IS NOT NULL -- Basic filter
 )
 -- Add final type conversions and cleaning here
 SELECT
     app_name,
+    app_key,
     app_category,
     app_rating,
     reviews_text,
@@ -15,6 +15,8 @@ cleaned AS (
     SELECT
         -- Standardize column names to match Star Schema
         "App" AS app_name,
+        -- Resolved through the normalized app-name index, so casing/punctuation variants still join
+        idx.app_key,
         "Translated_Review" AS review_text,
         "Sentiment" AS review_sentiment,
          -- Cast to appropriate types, handling potential errors/NULLs represented as strings
@@ -26,6 +28,9 @@ cleaned AS (
 
     FROM
         source
+    LEFT JOIN {{ ref('app_name_index') }} idx
+        ON source."App" = idx.raw_name
+        AND idx.match_type <> 'retired' -- kept only to reserve the keys of removed apps
     WHERE
         "Translated_Review" IS NOT NULL -- Filter out empty reviews
 )
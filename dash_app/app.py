@@ -8,18 +8,28 @@ import os
 from dash.dependencies import Input, Output
 import dash_bootstrap_components as dbc # Keep bootstrap for basic styling
 import numpy as np # <<< ADDED IMPORT
+import time
+import sys
+from metrics import (CALLBACK_SECONDS, FIGURE_SECONDS, QUERY_SECONDS, QUERY_ROWS, CACHE_REQUESTS,
+                     PROFILER, register_metrics_endpoint)
 
 # 1. تحديد مسار قاعدة بيانات DuckDB
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_PATH = os.path.join(PROJECT_ROOT, "warehouse", "apppulse.duckdb")
 
+# kpi_sketches lives with the pipeline scripts (it also builds the sketches)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "scripts"))
+from kpi_sketches import load_category_sketches, load_kpi_rows, merge_category_sketches
+# Interactive execution profile: capped threads/memory so the dashboard never starves a dbt build
+from duckdb_profile import connect as connect_duckdb
+
 # 2. تحميل البيانات الأولية (بالأسماء الصحيحة المؤكدة)
 def load_data_from_duckdb():
     """يتصل بـ DuckDB ويستخلص البيانات (بالأسماء الصحيحة المؤكدة)."""
     print(f"Connecting to DuckDB at: {DB_PATH}")
     df = pd.DataFrame() # Initialize empty
     try:
-        conn = duckdb.connect(database=DB_PATH, read_only=True)
+        conn = connect_duckdb(DB_PATH, workload="interactive", read_only=True)
 
         # --- Debug: Check if tables exist ---
         tables = conn.execute("SHOW TABLES").fetchall()
@@ -37,7 +47,7 @@ def load_data_from_duckdb():
         # --- الاستعلام الرئيسي المصحح ---
         # Using confirmed correct column names from dbt models:
         # dc.app_category, da.app_size_bytes, fm.app_price, da.last_updated_date
-        # Joining reviews on app_name (assuming stg_reviews has app_name)
+        # Joining reviews on app_key (normalized app-name index, see scripts/build_app_name_index.py)
         # Assuming dim_apps contains the necessary descriptive fields
         query = """
         SELECT
@@ -55,11 +65,13 @@ def load_data_from_duckdb():
         JOIN main.dim_apps da ON fm.app_id = da.app_id
         JOIN main.dim_categories dc ON fm.category_id = dc.category_id
         -- Use LEFT JOIN for reviews in case some apps have no reviews in stg_reviews
-        -- Join using app_name as confirmed for stg_reviews structure
-        LEFT JOIN main.stg_reviews sr ON da.app_name = sr.app_name
+        -- Join on the integer app_key resolved by the app-name index (not free-text app_name)
+        LEFT JOIN main.stg_reviews sr ON da.app_key = sr.app_key
         """
 
-        df = conn.execute(query).fetchdf()
+        with QUERY_SECONDS.time(query="load_dashboard_data"):
+            df = conn.execute(query).fetchdf()
+        QUERY_ROWS.inc(len(df), query="load_dashboard_data")
 
         # Add conversion for size AFTER fetching
         if 'app_size_bytes' in df.columns:
@@ -98,12 +110,50 @@ def load_data_from_duckdb():
     return df
 
 
+def load_kpi_sketches_from_duckdb():
+    """Loads the per-category KPI sketches maintained by scripts/kpi_sketches.py (empty dict if not built yet)."""
+    try:
+        conn = connect_duckdb(DB_PATH, workload="interactive", read_only=True)
+        try:
+            with QUERY_SECONDS.time(query="load_kpi_sketches"):
+                sketches = load_category_sketches(conn)
+            QUERY_ROWS.inc(len(sketches), query="load_kpi_sketches")
+        finally:
+            conn.close()
+    except duckdb.IOException:
+        return {}
+    if not sketches:
+        print("⚠️ KPI sketches not found; KPI cards will be computed exactly from stg_apps.")
+    return sketches
+
+
+def load_kpi_rows_from_duckdb():
+    """Loads the stg_apps rows the sketches summarize, for exact KPIs when no sketches exist."""
+    try:
+        conn = connect_duckdb(DB_PATH, workload="interactive", read_only=True)
+        try:
+            with QUERY_SECONDS.time(query="load_kpi_rows"):
+                rows = load_kpi_rows(conn)
+            QUERY_ROWS.inc(len(rows), query="load_kpi_rows")
+        finally:
+            conn.close()
+    except (duckdb.IOException, duckdb.CatalogException) as e:
+        print(f"⚠️ Could not load stg_apps for the KPI cards: {e}")
+        return pd.DataFrame(columns=['category', 'app_name', 'app_rating', 'installs_int'])
+    return rows
+
+
 # تحميل البيانات في متغير عام
 app_data_df = load_data_from_duckdb()
+category_sketches = load_kpi_sketches_from_duckdb()
+# Same rows and semantics as the sketches (every stg_apps row), so both KPI paths agree
+kpi_rows_df = pd.DataFrame() if category_sketches else load_kpi_rows_from_duckdb()
 
 # تهيئة تطبيق Dash (Using simple LUX theme)
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.LUX])
 app.title = "AppPulse Analytics"
+# Prometheus-style /metrics endpoint (+ /debug/slow-requests when DASH_PROFILE_SLOW_MS is set)
+register_metrics_endpoint(app.server)
 
 # --- 3. تصميم لوحة التحكم (Layout - Simplified back to original structure) ---
 
@@ -157,7 +207,25 @@ def _render_kpi_card(title, value):
     return dbc.Col(dbc.Card([
         dbc.CardHeader(title),
         dbc.CardBody(html.H4(f"{value}", className="card-title text-center"))
-    ]), width=12, sm=6, md=4, className="text-center mb-3") # Adjusted grid for 3 cards
+    ]), width=12, sm=6, md=3, className="text-center mb-3") # Adjusted grid for 4 cards
+
+# app_data_df is loaded once at startup, so each category's filtered frame can be reused across callbacks
+_filtered_cache = {}
+
+def _filter_by_category(selected_category):
+    """ Returns the rows for a category (or all rows), cached per category. """
+    if selected_category in _filtered_cache:
+        CACHE_REQUESTS.inc(cache="category_filter", result="hit")
+        return _filtered_cache[selected_category]
+    CACHE_REQUESTS.inc(cache="category_filter", result="miss")
+
+    if selected_category and 'category_name' in app_data_df.columns:
+        # Ensure filtering doesn't fail if category_name column ended up with None/NaN
+        filtered_df = app_data_df.loc[app_data_df['category_name'].fillna('Unknown') == selected_category].copy()
+    else:
+        filtered_df = app_data_df.copy()
+    _filtered_cache[selected_category] = filtered_df
+    return filtered_df
 
 @app.callback(
     [Output('kpi-output', 'children'),
@@ -168,7 +236,12 @@ def _render_kpi_card(title, value):
     [Input('category-dropdown', 'value')]
 )
 def update_graph(selected_category):
-    """Updates KPIs and charts based on selected category."""
+    """Updates KPIs and charts based on selected category (timed and optionally profiled)."""
+    with CALLBACK_SECONDS.time(callback="update_graph"), PROFILER.profile(f"update_graph[{selected_category}]"):
+        return _build_dashboard_outputs(selected_category)
+
+def _build_dashboard_outputs(selected_category):
+    """Builds the KPI cards and figures for the selected category."""
     # Use the global app_data_df which was loaded at startup
     global app_data_df
 
@@ -179,12 +252,10 @@ def update_graph(selected_category):
         return [dbc.Row(dbc.Col(error_msg, width=12))], empty_fig, empty_fig, empty_fig, ""
 
     # Filter data
+    filtered_df = _filter_by_category(selected_category)
     if selected_category and 'category_name' in app_data_df.columns:
-        # Ensure filtering doesn't fail if category_name column ended up with None/NaN
-        filtered_df = app_data_df.loc[app_data_df['category_name'].fillna('Unknown') == selected_category].copy()
         title_suffix = f" in {selected_category}"
     else:
-        filtered_df = app_data_df.copy()
         title_suffix = " (All Categories)"
 
     print(f"Callback triggered. Category: {selected_category}. Filtered rows: {len(filtered_df)}")
@@ -198,13 +269,25 @@ def update_graph(selected_category):
 
 
     # --- KPIs ---
+    figure_start = time.perf_counter()
     kpi_cards_content = []
     try:
-        total_apps = filtered_df['app_name'].nunique()
-        avg_rating = filtered_df['average_user_rating'].mean()
+        if category_sketches:
+            # Constant-time answers from the mergeable per-category sketches (HLL distinct count, rating histogram, sums)
+            sketch = merge_category_sketches(category_sketches, [selected_category] if selected_category else None)
+            total_apps = sketch.distinct_apps
+            avg_rating = sketch.avg_rating
+            median_rating = sketch.rating_quantile(0.5)
+            total_installs = sketch.installs_sum
+        else:
+            # Exact values over the same stg_apps rows (the dashboard frame repeats each app once per review)
+            kpi_rows = kpi_rows_df[kpi_rows_df['category'] == selected_category] if selected_category else kpi_rows_df
+            total_apps = kpi_rows['app_name'].nunique()
+            avg_rating = kpi_rows['app_rating'].mean()
+            median_rating = kpi_rows['app_rating'].quantile(0.5)  # linear interpolation, like histogram_quantile
+            total_installs = int(kpi_rows['installs_int'].sum())
         avg_rating = round(avg_rating, 2) if pd.notna(avg_rating) else 0.0
-        # Ensure total_installs column exists before summing
-        total_installs = int(filtered_df['total_installs'].sum()) if 'total_installs' in filtered_df.columns else 0
+        median_rating = round(median_rating, 2) if pd.notna(median_rating) else 0.0
 
         # Format large numbers
         if total_installs >= 1_000_000_000: installs_display = f"{total_installs / 1_000_000_000:.1f}B"
@@ -216,17 +299,20 @@ def update_graph(selected_category):
         kpi_cards_content = [
             _render_kpi_card("Total Apps", f"{total_apps:,}"),
             _render_kpi_card("Avg Rating", f"{avg_rating} ⭐"),
+            _render_kpi_card("Median Rating", f"{median_rating} ⭐"),
             _render_kpi_card("Total Installs", installs_display)
         ]
     except Exception as e:
         print(f"Error calculating KPIs: {e}")
         # Return error message within a Col structure
         kpi_cards_content = [dbc.Col(dbc.Alert("Error calculating KPIs.", color="warning", className="text-center"), width=12)]
+    FIGURE_SECONDS.observe(time.perf_counter() - figure_start, figure="kpis")
 
     chart_height = 400
     chart_layout_defaults = dict(height=chart_height, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', margin=dict(l=40, r=20, t=60, b=40))
 
     # --- Top Rated Apps ---
+    figure_start = time.perf_counter()
     fig_rated = go.Figure().update_layout(title="Top Rated Apps", **chart_layout_defaults)
     try:
         if 'app_name' in filtered_df.columns and 'average_user_rating' in filtered_df.columns:
@@ -246,8 +332,10 @@ def update_graph(selected_category):
     except Exception as e:
         print(f"Error creating top rated apps chart: {e}")
         fig_rated.update_layout(title="Error loading Top Rated Apps")
+    FIGURE_SECONDS.observe(time.perf_counter() - figure_start, figure="top_rated_apps")
 
     # --- Rating vs Installs ---
+    figure_start = time.perf_counter()
     fig_scatter = go.Figure().update_layout(title="Rating vs Installs", **chart_layout_defaults)
     try:
         scatter_cols = ['app_name', 'average_user_rating', 'total_installs', 'price']
@@ -273,8 +361,10 @@ def update_graph(selected_category):
     except Exception as e:
         print(f"Error creating scatter plot: {e}")
         fig_scatter.update_layout(title="Error loading Rating vs Installs")
+    FIGURE_SECONDS.observe(time.perf_counter() - figure_start, figure="rating_installs_scatter")
 
     # --- Sentiment Summary ---
+    figure_start = time.perf_counter()
     fig_sentiment = go.Figure().update_layout(title="Sentiment Summary", **chart_layout_defaults)
     try:
          # Use the original 'review_sentiment' column which should exist now
@@ -301,6 +391,7 @@ def update_graph(selected_category):
     except Exception as e:
         print(f"Error creating sentiment chart: {e}")
         fig_sentiment.update_layout(title="Error loading User Sentiment")
+    FIGURE_SECONDS.observe(time.perf_counter() - figure_start, figure="sentiment_summary")
 
     placeholder_content = "" # Keep placeholder empty
 
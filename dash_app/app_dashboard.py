@@ -1,3 +1,5 @@
+import os
+import sys
 import duckdb
 import pandas as pd
 from dash import Dash, dcc, html
@@ -5,7 +7,9 @@ import plotly.express as px
 
 # --- Load data from warehouse (DuckDB)
 WAREHOUSE_PATH = "/workspaces/apppulse-elt-project/warehouse/warehouse.duckdb"
-conn = duckdb.connect("/workspaces/apppulse-elt-project/warehouse/apppulse.duckdb", read_only=True)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+from duckdb_profile import connect as connect_duckdb
+conn = connect_duckdb("/workspaces/apppulse-elt-project/warehouse/apppulse.duckdb", workload="interactive", read_only=True)
 
 # Load fact table
 df = conn.execute("SELECT * FROM main.fact_app_metrics").fetchdf()
@@ -0,0 +1,208 @@
+import os
+import sys
+import time
+import threading
+import traceback
+from collections import Counter, deque
+from contextlib import contextmanager
+
+from flask import Response, jsonify, request
+
+# --- Metrics Configuration (Using Env Vars) ---
+# Sampling profiler is opt-in: set DASH_PROFILE_SLOW_MS to profile requests slower than that many ms
+PROFILE_SLOW_MS = float(os.getenv("DASH_PROFILE_SLOW_MS", 0))
+PROFILE_INTERVAL_MS = float(os.getenv("DASH_PROFILE_INTERVAL_MS", 5))
+PROFILE_KEEP_LAST = int(os.getenv("DASH_PROFILE_KEEP_LAST", 20))
+
+# Latency buckets in seconds (Prometheus convention), payload buckets in bytes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000, 10_000_000)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            lines.extend(self._render_samples())
+        return lines
+
+
+class CounterMetric(_Metric):
+    metric_type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_samples(self):
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value}" for key, value in sorted(self._values.items())]
+
+
+class HistogramMetric(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.setdefault(key, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    state["counts"][i] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_samples(self):
+        lines = []
+        for key, state in sorted(self._values.items()):
+            for upper, count in zip(self.buckets, state["counts"]):
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, ('le', upper))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, ('le', '+Inf'))} {state['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {state['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {state['count']}")
+        return lines
+
+
+class Registry:
+    """Holds the dashboard metrics and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, documentation, label_names=()):
+        metric = CounterMetric(name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        metric = HistogramMetric(name, documentation, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+CALLBACK_SECONDS = REGISTRY.histogram(
+    "apppulse_callback_duration_seconds", "Time spent inside Dash callbacks.", ["callback"])
+FIGURE_SECONDS = REGISTRY.histogram(
+    "apppulse_figure_duration_seconds", "Time spent building each KPI block / figure.", ["figure"])
+QUERY_SECONDS = REGISTRY.histogram(
+    "apppulse_duckdb_query_duration_seconds", "DuckDB query duration.", ["query"])
+QUERY_ROWS = REGISTRY.counter(
+    "apppulse_duckdb_rows_returned_total", "Rows returned by DuckDB queries.", ["query"])
+PAYLOAD_BYTES = REGISTRY.histogram(
+    "apppulse_response_payload_bytes", "Size of Dash HTTP responses.", ["path"], buckets=BYTES_BUCKETS)
+CACHE_REQUESTS = REGISTRY.counter(
+    "apppulse_cache_requests_total", "Dashboard cache lookups by result (hit/miss).", ["cache", "result"])
+
+
+# ------------------------------------------------------------------- #
+# Opt-in sampling profiler for slow requests
+# ------------------------------------------------------------------- #
+class SamplingProfiler:
+    """Samples the stack of one thread at a fixed interval while a request runs.
+
+    Only the aggregated stacks of requests slower than PROFILE_SLOW_MS are kept, so the
+    overhead on fast requests is one sleeping thread.
+    """
+
+    def __init__(self, slow_ms=PROFILE_SLOW_MS, interval_ms=PROFILE_INTERVAL_MS, keep_last=PROFILE_KEEP_LAST):
+        self.enabled = slow_ms > 0
+        self.slow_seconds = slow_ms / 1000.0
+        self.interval_seconds = interval_ms / 1000.0
+        self.slow_requests = deque(maxlen=keep_last)
+
+    def _sample(self, thread_id, samples, stop_event):
+        while not stop_event.wait(self.interval_seconds):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                break
+            stack = traceback.extract_stack(frame)
+            samples[";".join(f"{f.name} ({os.path.basename(f.filename)}:{f.lineno})" for f in stack)] += 1
+
+    @contextmanager
+    def profile(self, name):
+        if not self.enabled:
+            yield
+            return
+        samples, stop_event = Counter(), threading.Event()
+        sampler = threading.Thread(target=self._sample, args=(threading.get_ident(), samples, stop_event), daemon=True)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            yield
+        finally:
+            stop_event.set()
+            sampler.join()
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.slow_seconds:
+                self.slow_requests.append({
+                    "name": name,
+                    "duration_ms": round(elapsed * 1000, 1),
+                    "timestamp": time.time(),
+                    "top_stacks": samples.most_common(10),
+                })
+                print(f"🐢 Slow request '{name}' took {elapsed * 1000:.0f} ms ({sum(samples.values())} samples).")
+
+
+PROFILER = SamplingProfiler()
+
+
+def register_metrics_endpoint(server):
+    """Adds /metrics (Prometheus text format), /debug/slow-requests and payload size tracking to the Flask server."""
+    @server.route("/metrics")
+    def metrics():
+        return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+    @server.route("/debug/slow-requests")
+    def slow_requests():
+        return jsonify(enabled=PROFILER.enabled, requests=list(PROFILER.slow_requests))
+
+    @server.after_request
+    def record_payload_size(response):
+        if request.path.startswith("/_dash-update-component") and not response.direct_passthrough:
+            PAYLOAD_BYTES.observe(response.calculate_content_length() or 0, path=request.path)
+        return response
@@ -1,7 +1,11 @@
-import duckdb
 import os
+import sys
 import pandas as pd # تم إضافة pandas لطباعة النتيجة
 
+# إعدادات DuckDB المشتركة (threads / memory_limit / temp_directory) في مجلد scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from duckdb_profile import connect as connect_duckdb
+
 # المسار الفعلي لقاعدة بيانات DuckDB كما هو محدد في profiles.yml
 # تم استخراجه من مخرجات dbt debug
 DB_FILE = "warehouse/apppulse.duckdb" 
@@ -41,7 +45,7 @@ def run_analysis_query():
     conn = None
     try:
         # 4. الاتصال بالمسار المؤكد
-        conn = duckdb.connect(database=db_path_to_use, read_only=True)
+        conn = connect_duckdb(db_path_to_use, workload="interactive", read_only=True)
         
         print(f"✅ تم الاتصال بقاعدة البيانات بنجاح في المسار: {db_path_to_use}")
         
@@ -2,6 +2,11 @@ import os
 import subprocess
 import sys
 
+# stage_cache يعيش في مجلد scripts بجانب سكريبتات الإدخال
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+import stage_cache
+import duckdb_profile
+
 # ------------------------------------------------------------------- #
 # نفس المسارات اللي حددناها للـ DAG
 # ------------------------------------------------------------------- #
@@ -12,6 +17,8 @@ DBT_PROJECT_DIR = "F:/DEPI/Materials/Project_1_data_engineer/apppulse-project/ap
 
 SCRIPT_MYSQL = os.path.join(PROJECT_ROOT, "scripts", "ingest_apps_to_mysql.py")
 SCRIPT_MONGO = os.path.join(PROJECT_ROOT, "scripts", "ingest_reviews_to_mongodb.py")
+SCRIPT_APP_INDEX = os.path.join(PROJECT_ROOT, "scripts", "build_app_name_index.py")
+SCRIPT_KPI_SKETCHES = os.path.join(PROJECT_ROOT, "scripts", "kpi_sketches.py")
 
 # ------------------------------------------------------------------- #
 # دالة لتشغيل الأوامر
@@ -44,6 +51,16 @@ def run_command(command_list):
         print(f"خطأ: لم يتم العثور على الملف. هل المسار صحيح؟ \n{command_list[0]}")
         return False
 
+def run_cached_stage(stage_name, command_list):
+    """يشغل المرحلة فقط لو مدخلاتها اتغيرت منذ آخر تشغيل ناجح، ويسجلها بعد النجاح."""
+    if stage_cache.is_stage_fresh(stage_name):
+        print(f"\n⏭️ ... [ SKIPPED ] ... {stage_name} (المدخلات لم تتغير)\n")
+        return True
+    if not run_command(command_list):
+        return False
+    stage_cache.record_stage(stage_name)
+    return True
+
 # ------------------------------------------------------------------- #
 # تعريف البايبلاين
 # ------------------------------------------------------------------- #
@@ -53,31 +70,50 @@ def main_pipeline():
     print("==============================================")
 
     # --- المهمة 1: تحميل البيانات إلى MySQL ---
-    if not run_command([VENV_PYTHON, SCRIPT_MYSQL]):
+    if not run_cached_stage("ingest_apps", [VENV_PYTHON, SCRIPT_MYSQL]):
         print("فشلت مهمة MySQL. يتم إيقاف البايبلاين.")
         return
 
     # --- المهمة 2: تحميل البيانات إلى MongoDB وإنشاء الـ Seed ---
-    if not run_command([VENV_PYTHON, SCRIPT_MONGO]):
+    if not run_cached_stage("ingest_reviews", [VENV_PYTHON, SCRIPT_MONGO]):
         print("فشلت مهمة MongoDB. يتم إيقاف البايبلاين.")
         return
 
-    # --- المهمة 3: تشغيل dbt run (بعد انتهاء الإدخال) ---
-    # ملاحظة: أمر dbt run بيحتاج يتنفذ من جوه مجلد dbt
-    # فالأمر هيكون [مسار dbt, "run"] والـ cwd هو مسار مجلد dbt
-    print(f"\n🚀 ... [ RUNNING ] ...\ndbt run (in {DBT_PROJECT_DIR})\n")
-    try:
-        subprocess.run(
-            [VENV_DBT, "run"],  # الأمر اللي هيتنفذ
-            check=True,
-            text=True,
-            cwd=DBT_PROJECT_DIR, # أهم جزء: غيّر مسار العمل للمجلد دا
-            stderr=sys.stderr,
-            stdout=sys.stdout
-        )
-        print(f"\n✅ ... [ SUCCESS ] ...\ndbt run\n")
-    except subprocess.CalledProcessError as e:
-        print(f"\n❌ ... [ FAILED ] ...\ndbt run\nError: {e}")
+    # --- المهمة 2.5: بناء فهرس أسماء التطبيقات (app_name -> app_key) للربط بين المراجعات والتطبيقات ---
+    if not run_cached_stage("build_app_name_index", [VENV_PYTHON, SCRIPT_APP_INDEX]):
+        print("فشلت مهمة فهرس أسماء التطبيقات. يتم إيقاف البايبلاين.")
+        return
+
+    # --- المهمة 3: تشغيل dbt seed + dbt run (بعد انتهاء الإدخال) ---
+    # ملاحظة: أوامر dbt بتحتاج تتنفذ من جوه مجلد dbt
+    # لو الـ seeds والموديلز ما اتغيرتش بنتخطى المرحلة كلها،
+    # وإلا بنبني الموديلز المتغيرة واللي بعدها بس (state:modified+)، والـ seeds اللي محتواها اتغير بالاسم (seed+)
+    if stage_cache.is_stage_fresh("dbt_build"):
+        print("\n⏭️ ... [ SKIPPED ] ... dbt_build (الموديلز والـ seeds لم تتغير)\n")
+    else:
+        state_args = stage_cache.dbt_state_args()
+        for dbt_command in (["seed"], ["run"]):
+            print(f"\n🚀 ... [ RUNNING ] ...\ndbt {' '.join(dbt_command + state_args)} (in {DBT_PROJECT_DIR})\n")
+            try:
+                subprocess.run(
+                    [VENV_DBT] + dbt_command + state_args,  # الأمر اللي هيتنفذ
+                    check=True,
+                    text=True,
+                    cwd=DBT_PROJECT_DIR, # أهم جزء: غيّر مسار العمل للمجلد دا
+                    env=duckdb_profile.dbt_env("batch"), # threads / memory_limit / temp_directory لـ profiles.yml
+                    stderr=sys.stderr,
+                    stdout=sys.stdout
+                )
+                print(f"\n✅ ... [ SUCCESS ] ...\ndbt {dbt_command[0]}\n")
+            except subprocess.CalledProcessError as e:
+                print(f"\n❌ ... [ FAILED ] ...\ndbt {dbt_command[0]}\nError: {e}")
+                return
+        stage_cache.save_dbt_state(DBT_PROJECT_DIR)
+        stage_cache.record_stage("dbt_build")
+
+    # --- المهمة 4: تحديث ملخصات الـ KPI (sketches) لكل فئة بشكل تزايدي ---
+    if not run_cached_stage("build_kpi_sketches", [VENV_PYTHON, SCRIPT_KPI_SKETCHES]):
+        print("فشلت مهمة تحديث الـ KPI sketches. يتم إيقاف البايبلاين.")
         return
 
     print("==============================================")
@@ -0,0 +1,62 @@
+import os
+import sys
+import time
+import tempfile
+
+from compressed_io import resolve_source, read_csv_source
+from connectors import CONNECTORS, ConnectorError, EmbeddedConnector, get_connector
+
+# --- Benchmark Configuration (Using Env Vars) ---
+# Comma separated; mysql/mongo are only reachable with the docker-compose services running
+BENCH_CONNECTORS = os.getenv("BENCH_CONNECTORS", "embedded,direct").split(",")
+BENCH_REPEAT = int(os.getenv("BENCH_REPEAT", 3))
+
+# --- File Paths ---
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARCHIVE_PATH = os.path.join(PROJECT_ROOT, "data", "archive.zip")
+SOURCES = {
+    "apps_raw": resolve_source(os.path.join(PROJECT_ROOT, "data", "google_play_apps.csv"), ARCHIVE_PATH, "googleplaystore.csv"),
+    "reviews_raw": resolve_source(os.path.join(PROJECT_ROOT, "data", "googleplaystore_user_reviews.csv"), ARCHIVE_PATH, "googleplaystore_user_reviews.csv"),
+}
+
+
+def _make_connector(kind, tmp_dir):
+    # The embedded store gets a throwaway file so the benchmark never touches warehouse/
+    if kind == "embedded":
+        return EmbeddedConnector(os.path.join(tmp_dir, "bench.sqlite"))
+    return get_connector(kind)
+
+
+def benchmark_connectors():
+    """Times the load + extract round trip of each connector on the real source files."""
+    frames = {table: read_csv_source(spec, low_memory=False) for table, spec in SOURCES.items()}
+    print(f"📊 Benchmark: {', '.join(f'{t}={len(df)} rows' for t, df in frames.items())}, best of {BENCH_REPEAT}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for kind in (k.strip() for k in BENCH_CONNECTORS):
+            if kind not in CONNECTORS:
+                print(f"⚠️ Unknown connector '{kind}', skipping.")
+                continue
+            for table, df in frames.items():
+                best_load, best_extract = float("inf"), float("inf")
+                try:
+                    for _ in range(BENCH_REPEAT):
+                        with _make_connector(kind, tmp_dir) as connector:
+                            start = time.perf_counter()
+                            connector.load(table, df)
+                            loaded = time.perf_counter()
+                            connector.extract(table)
+                            best_load = min(best_load, loaded - start)
+                            best_extract = min(best_extract, time.perf_counter() - loaded)
+                except ConnectorError as e:
+                    print(f"⚠️ {kind}: {e}")
+                    break
+                print(f"{kind:>10} | {table:<12} | load {best_load * 1000:8.1f} ms | extract {best_extract * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    try:
+        benchmark_connectors()
+    except FileNotFoundError as e:
+        print(f"❌ خطأ: لم يتم العثور على ملف المصدر: {e}")
+        sys.exit(1)
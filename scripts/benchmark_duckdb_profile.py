@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+
+import duckdb_profile
+
+# --- Benchmark Configuration (Using Env Vars) ---
+BENCH_APPS = int(os.getenv("BENCH_APPS", 2_000_000))
+BENCH_REVIEWS = int(os.getenv("BENCH_REVIEWS", 20_000_000))
+BENCH_MEMORY_LIMIT = os.getenv("BENCH_MEMORY_LIMIT", "512MB")  # fixed budget, well below the join's working set
+
+# Same shape as fact_app_metrics: reviews aggregated per app_key, then joined back to every app row
+FACT_QUERY = """
+    CREATE TABLE fact_bench AS
+    WITH reviews AS (
+        SELECT app_key, AVG(sentiment) AS avg_sentiment, COUNT(*) AS total_reviews,
+               MAX(review_text) AS last_review
+        FROM reviews_bench
+        GROUP BY app_key
+    )
+    SELECT a.app_key, a.app_name, r.avg_sentiment, r.total_reviews, r.last_review
+    FROM apps_bench a
+    LEFT JOIN reviews r ON a.app_key = r.app_key
+"""
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except FileNotFoundError:
+                pass  # spill file removed while walking
+    return total
+
+
+def benchmark_large_join():
+    """Runs a fact_app_metrics-shaped join under the batch profile with a fixed memory cap, tracking spill size."""
+    work_dir = tempfile.mkdtemp(prefix="apppulse_bench_")
+    os.environ["DUCKDB_BATCH_MEMORY_LIMIT"] = BENCH_MEMORY_LIMIT
+    os.environ["DUCKDB_BATCH_TEMP_DIRECTORY"] = os.path.join(work_dir, "spill")
+    settings = duckdb_profile.execution_settings("batch")
+    print(f"📊 Benchmark: {BENCH_APPS:,} apps x {BENCH_REVIEWS:,} reviews, settings={settings}")
+
+    conn = duckdb_profile.connect(os.path.join(work_dir, "bench.duckdb"), workload="batch")
+    peak_spill = [0]
+    done = threading.Event()
+
+    def watch_spill():
+        while not done.wait(0.05):
+            peak_spill[0] = max(peak_spill[0], _dir_size(settings["temp_directory"]))
+
+    try:
+        conn.execute(f"CREATE TABLE apps_bench AS SELECT i AS app_key, 'app ' || i AS app_name FROM range({BENCH_APPS}) t(i)")
+        conn.execute(f"""
+            CREATE TABLE reviews_bench AS
+            SELECT (i * 7919) % {BENCH_APPS} AS app_key, (i % 3) / 2.0 AS sentiment,
+                   'review text number ' || i AS review_text
+            FROM range({BENCH_REVIEWS}) t(i)
+        """)
+
+        watcher = threading.Thread(target=watch_spill, daemon=True)
+        watcher.start()
+        start = time.perf_counter()
+        conn.execute(FACT_QUERY)
+        elapsed = time.perf_counter() - start
+        done.set()
+        watcher.join()
+
+        rows = conn.execute("SELECT COUNT(*) FROM fact_bench").fetchone()[0]
+        print(f"✅ Join finished in {elapsed:.2f} s under memory_limit={settings['memory_limit']}: "
+              f"{rows:,} rows, peak spill {peak_spill[0] / (1024 * 1024):.1f} MB")
+    finally:
+        done.set()
+        conn.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    try:
+        benchmark_large_join()
+    except Exception as e:
+        print(f"❌ فشل الـ benchmark: {e}")
+        sys.exit(1)
@@ -0,0 +1,143 @@
+import os
+import re
+import sys
+import difflib
+import unicodedata
+
+import pandas as pd
+
+# --- Matching Configuration (Using Env Vars) ---
+FUZZY_CUTOFF = float(os.getenv("APP_NAME_FUZZY_CUTOFF", 0.92))
+FUZZY_MAX_CANDIDATES = int(os.getenv("APP_NAME_FUZZY_MAX_CANDIDATES", 200))
+READ_CHUNK_SIZE = 200000
+
+# --- File Paths ---
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEEDS_DIR = os.path.join(PROJECT_ROOT, "app_dbt", "seeds")
+APPS_SEED_PATH = os.path.join(SEEDS_DIR, "apps_from_mysql.csv")
+REVIEWS_SEED_PATH = os.path.join(SEEDS_DIR, "reviews_from_mongo.csv")
+INDEX_SEED_PATH = os.path.join(SEEDS_DIR, "app_name_index.csv")  # persistent index, also loaded by dbt seed
+
+INDEX_COLUMNS = ["raw_name", "normalized_name", "app_key", "match_type"]
+
+_SYMBOLS_RE = re.compile(r"[™®©℠]")
+_PUNCT_RE = re.compile(r"[^\w\s]", flags=re.UNICODE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_names(names):
+    """Canonical form used for matching: NFKC, casefolded, no trademark symbols/punctuation, single spaces."""
+    # Symbols are stripped before NFKC, which would otherwise expand ™ into "TM"
+    text = names.fillna("").astype(str).str.replace(_SYMBOLS_RE, "", regex=True)
+    text = text.map(lambda s: unicodedata.normalize("NFKC", s)).str.casefold()
+    text = text.str.replace(_PUNCT_RE, " ", regex=True).str.replace("_", " ", regex=False)
+    return text.str.replace(_SPACE_RE, " ", regex=True).str.strip()
+
+
+def _read_unique_names(csv_path):
+    """Reads only the App column in chunks and returns its distinct values."""
+    names = set()
+    for chunk in pd.read_csv(csv_path, usecols=["App"], dtype={"App": "string"}, chunksize=READ_CHUNK_SIZE):
+        names.update(chunk["App"].dropna().unique())
+    return pd.Series(sorted(names), dtype="object")
+
+
+def _load_existing_keys():
+    """Returns the raw_name -> app_key assignments from the previous index (live and retired), so keys stay stable."""
+    if not os.path.exists(INDEX_SEED_PATH):
+        return {}
+    previous = pd.read_csv(INDEX_SEED_PATH, dtype={"raw_name": "string"}, keep_default_na=False)
+    previous = previous[previous["match_type"].isin(["app", "retired"])]
+    # Older indexes keyed apps by normalized name; a key shared by several apps stays with the first one
+    previous = previous.drop_duplicates(subset="app_key", keep="first")
+    return dict(zip(previous["raw_name"], previous["app_key"].astype(int)))
+
+
+def _fuzzy_match(names, key_by_normalized):
+    """Bounded fuzzy matching: candidates share the first 3 characters and have a similar length.
+
+    Ambiguous normalized names (key None) are valid candidates, so a review name closest to one
+    of them stays unmatched instead of falling through to a worse candidate.
+    """
+    blocks = {}
+    for normalized in key_by_normalized:
+        blocks.setdefault(normalized[:3], []).append(normalized)
+
+    matches = {}
+    for name in names:
+        max_len_diff = max(2, len(name) // 10)
+        candidates = [c for c in blocks.get(name[:3], []) if abs(len(c) - len(name)) <= max_len_diff]
+        if not candidates or len(candidates) > FUZZY_MAX_CANDIDATES:
+            continue
+        best = difflib.get_close_matches(name, candidates, n=1, cutoff=FUZZY_CUTOFF)
+        if best and key_by_normalized[best[0]] is not None:
+            matches[name] = key_by_normalized[best[0]]
+    return matches
+
+
+def build_app_name_index():
+    """Builds the raw app name -> integer app_key index used to join reviews to apps."""
+    print("--- بناء فهرس أسماء التطبيقات (app_name -> app_key) ---")
+
+    # --- A. Apps: every distinct raw name gets its own stable integer key ---
+    app_names = _read_unique_names(APPS_SEED_PATH)
+    apps = pd.DataFrame({"raw_name": app_names, "normalized_name": normalize_names(app_names)})
+
+    key_by_raw = _load_existing_keys()
+    next_key = max(key_by_raw.values(), default=0) + 1
+    for raw_name in apps["raw_name"]:
+        if raw_name not in key_by_raw:
+            key_by_raw[raw_name] = next_key
+            next_key += 1
+    apps["app_key"] = apps["raw_name"].map(key_by_raw)
+    apps["match_type"] = "app"
+    # Names that left the apps source stay in the index as 'retired' rows, so max() above still sees
+    # their keys and they are never handed to another app (the dbt joins skip these rows)
+    current = set(apps["raw_name"])
+    retired = pd.DataFrame([(name, key) for name, key in key_by_raw.items() if name not in current],
+                           columns=["raw_name", "app_key"])
+    retired["normalized_name"] = normalize_names(retired["raw_name"])
+    retired["match_type"] = "retired"
+
+    # A normalized name only resolves to an app when exactly one app has it ("AC Remote Control"
+    # and "ac remote control" are different apps, so a review for "Ac Remote Control" stays unmatched)
+    named = apps[apps["normalized_name"] != ""]
+    app_count = named.groupby("normalized_name")["app_key"].transform("size")
+    key_by_normalized = dict(zip(named["normalized_name"], named["app_key"].astype(object).where(app_count == 1, None)))
+    ambiguous = sum(key is None for key in key_by_normalized.values())
+
+    # --- B. Reviews: exact names join directly; the rest via unambiguous normalized, then bounded fuzzy matching ---
+    review_names = _read_unique_names(REVIEWS_SEED_PATH) if os.path.exists(REVIEWS_SEED_PATH) else pd.Series([], dtype="object")
+    reviews = pd.DataFrame({"raw_name": review_names[~review_names.isin(apps["raw_name"])]})
+    reviews["normalized_name"] = normalize_names(reviews["raw_name"])
+    reviews["app_key"] = reviews["normalized_name"].map(key_by_normalized)
+    reviews["match_type"] = "normalized"
+
+    unmatched = reviews["app_key"].isna() & (reviews["normalized_name"] != "") & ~reviews["normalized_name"].isin(key_by_normalized)
+    fuzzy_keys = _fuzzy_match(reviews.loc[unmatched, "normalized_name"].unique(), key_by_normalized)
+    reviews.loc[unmatched, "app_key"] = reviews.loc[unmatched, "normalized_name"].map(fuzzy_keys)
+    reviews.loc[unmatched, "match_type"] = "fuzzy"
+    reviews = reviews.dropna(subset=["app_key"])
+
+    index_df = pd.concat([apps, reviews, retired], ignore_index=True)[INDEX_COLUMNS]
+    index_df["app_key"] = index_df["app_key"].astype(int)
+
+    os.makedirs(SEEDS_DIR, exist_ok=True)
+    index_df.to_csv(INDEX_SEED_PATH, index=False)
+
+    matched_reviews = int(review_names.isin(index_df.loc[index_df["match_type"] != "retired", "raw_name"]).sum())
+    print(f"✅ {len(apps)} تطبيق في الفهرس (+{len(retired)} retired، {ambiguous} اسم normalized مشترك بين أكثر من تطبيق). "
+          f"أسماء المراجعات المطابقة: {matched_reviews}/{len(review_names)} "
+          f"(normalized: {(reviews['match_type'] == 'normalized').sum()}, fuzzy: {(reviews['match_type'] == 'fuzzy').sum()})")
+    print(f"✅ تم حفظ الفهرس كملف Seed في: {INDEX_SEED_PATH}")
+
+
+if __name__ == "__main__":
+    try:
+        build_app_name_index()
+    except FileNotFoundError as e:
+        print(f"❌ خطأ: لم يتم العثور على ملف Seed: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ حدث خطأ غير متوقع: {e}")
+        sys.exit(1)
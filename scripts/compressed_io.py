@@ -0,0 +1,110 @@
+import os
+import io
+import gzip
+import zipfile
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; zip and gzip only need the standard library
+    zstandard = None
+
+# --- Output Configuration (Using Env Vars) ---
+# none | gzip | zstd  — applied by write_csv() to outputs that are not dbt seeds
+# (e.g. `score_review_sentiment.py <input> <output>`)
+OUTPUT_COMPRESSION = os.getenv("OUTPUT_COMPRESSION", "none").lower()
+CSV_CHUNK_SIZE = int(os.getenv("CSV_CHUNK_SIZE", 100000))
+
+MEMBER_SEPARATOR = "::"  # e.g. data/archive.zip::googleplaystore_user_reviews.csv
+_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def split_source(spec):
+    """Splits 'archive.zip::member.csv' into (path, member). Plain paths return member=None."""
+    if MEMBER_SEPARATOR in spec:
+        path, member = spec.split(MEMBER_SEPARATOR, 1)
+        return path, member
+    return spec, None
+
+
+def resolve_source(csv_path, archive_path, member):
+    """Prefers an already extracted CSV, otherwise streams the member straight out of the archive."""
+    if os.path.exists(split_source(csv_path)[0]):
+        return csv_path
+    return f"{archive_path}{MEMBER_SEPARATOR}{member}"
+
+
+@contextmanager
+def open_source(spec):
+    """Opens a (possibly compressed) CSV source as a binary stream without extracting it to disk."""
+    path, member = split_source(spec)
+    lower_path = path.lower()
+
+    if lower_path.endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            if member is None:
+                csv_members = [m for m in archive.namelist() if m.lower().endswith(".csv")]
+                if len(csv_members) != 1:
+                    raise ValueError(f"{path} has {len(csv_members)} CSV members; use '{path}{MEMBER_SEPARATOR}<member>'")
+                member = csv_members[0]
+            with archive.open(member) as stream:
+                yield stream
+    elif lower_path.endswith(".gz"):
+        with gzip.open(path, "rb") as stream:
+            yield stream
+    elif lower_path.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError("Reading .zst sources requires the 'zstandard' package (pip install zstandard).")
+        with open(path, "rb") as raw, zstandard.ZstdDecompressor().stream_reader(raw) as stream:
+            yield io.BufferedReader(stream)
+    else:
+        with open(path, "rb") as stream:
+            yield stream
+
+
+def iter_csv_chunks(spec, chunksize=CSV_CHUNK_SIZE, **read_csv_kwargs):
+    """Yields DataFrame chunks, decompressing the source on the fly."""
+    with open_source(spec) as stream:
+        for chunk in pd.read_csv(stream, chunksize=chunksize, **read_csv_kwargs):
+            yield chunk
+
+
+def read_csv_source(spec, chunksize=CSV_CHUNK_SIZE, **read_csv_kwargs):
+    """Reads a whole (possibly compressed) CSV source through the chunked reader."""
+    chunks = list(iter_csv_chunks(spec, chunksize=chunksize, **read_csv_kwargs))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
+
+
+def compression_for(path):
+    """Infers the compression of an existing output from its extension."""
+    for compression, extension in _EXTENSIONS.items():
+        if path.lower().endswith(extension):
+            return compression
+    return "none"
+
+
+def compressed_path(path, compression=None):
+    """Appends the extension for the configured output compression (if any) to the path."""
+    compression = (compression or OUTPUT_COMPRESSION).lower()
+    extension = _EXTENSIONS.get(compression, "")
+    return path if not extension or path.endswith(extension) else path + extension
+
+
+def write_csv(df, path, compression=None, **to_csv_kwargs):
+    """Writes a CSV, optionally gzip/zstd compressed. Returns the path that was written.
+
+    dbt seeds must stay plain CSV (dbt seed only loads .csv files), so seed writers pass
+    compression="none"; other outputs follow OUTPUT_COMPRESSION. Chunked writers can pass
+    mode="a": gzip members and zstd frames concatenate into one valid stream.
+    """
+    compression = (compression or OUTPUT_COMPRESSION).lower()
+    if compression == "zstd" and zstandard is None:
+        raise ImportError("Writing .zst output requires the 'zstandard' package (pip install zstandard).")
+    out_path = compressed_path(path, compression)
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    df.to_csv(out_path, compression=compression if compression in _EXTENSIONS else None, **to_csv_kwargs)
+    return out_path
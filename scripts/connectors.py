@@ -0,0 +1,218 @@
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+# --- Connector Configuration (Using Env Vars) ---
+# mysql | mongo | embedded | direct  (SOURCE_CONNECTOR overrides both ingest scripts at once)
+SOURCE_CONNECTOR = os.getenv("SOURCE_CONNECTOR")
+APPS_CONNECTOR = os.getenv("APPS_CONNECTOR", SOURCE_CONNECTOR or "mysql")
+REVIEWS_CONNECTOR = os.getenv("REVIEWS_CONNECTOR", SOURCE_CONNECTOR or "mongo")
+
+# --- File Paths ---
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EMBEDDED_DB_PATH = os.getenv("EMBEDDED_DB_PATH", os.path.join(PROJECT_ROOT, "warehouse", "operational.sqlite"))
+
+INSERT_BATCH_SIZE = 10000
+
+
+class ConnectorError(Exception):
+    """Raised when a source store cannot be reached or a load/extract fails."""
+
+
+def _to_records(df):
+    """Rows as tuples with NaN replaced by None (what DB-API drivers expect)."""
+    return [tuple(row) for row in df.replace({np.nan: None}).itertuples(index=False, name=None)]
+
+
+def _infer_schema(df):
+    schema = {}
+    for col, dtype in df.dtypes.items():
+        if pd.api.types.is_integer_dtype(dtype):
+            schema[col] = "BIGINT"
+        elif pd.api.types.is_float_dtype(dtype):
+            schema[col] = "DOUBLE NULL"
+        else:
+            schema[col] = "TEXT"
+    return schema
+
+
+class SourceConnector:
+    """Load / extract interface for the operational stores the ingest scripts write through.
+
+    load() replaces the table (or collection) with the DataFrame; extract() reads it back.
+    Connectors are context managers so the scripts always close their connections.
+    """
+
+    name = "source"
+
+    def connect(self):
+        return self
+
+    def close(self):
+        pass
+
+    def load(self, table, df, schema=None):
+        raise NotImplementedError
+
+    def extract(self, table):
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        print(f"--- تم إغلاق اتصال {self.name} ---")
+        return False
+
+
+class _SQLConnector(SourceConnector):
+    """Shared DB-API logic for MySQL and the embedded SQLite store."""
+
+    placeholder = "%s"
+
+    def __init__(self):
+        self.connection = None
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def load(self, table, df, schema=None):
+        schema = schema or _infer_schema(df)
+        columns = list(schema)
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            column_defs = ",\n".join(f"`{col}` {sql_type}" for col, sql_type in schema.items())
+            cursor.execute(f"CREATE TABLE {table} (\n{column_defs}\n)")
+            insert_query = (f"INSERT INTO {table} ({', '.join(f'`{c}`' for c in columns)}) "
+                            f"VALUES ({', '.join([self.placeholder] * len(columns))})")
+            records = _to_records(df[columns])
+            for start in range(0, len(records), INSERT_BATCH_SIZE):
+                cursor.executemany(insert_query, records[start:start + INSERT_BATCH_SIZE])
+            self.connection.commit()
+        finally:
+            cursor.close()
+        return len(df)
+
+    def extract(self, table):
+        return pd.read_sql(f"SELECT * FROM {table}", self.connection)
+
+
+class MySQLConnector(_SQLConnector):
+    name = "MySQL"
+
+    def __init__(self, host=None, user=None, password=None, database=None):
+        super().__init__()
+        self.params = dict(
+            host=host or os.getenv("MYSQL_HOST", "mysql_db"),
+            user=user or os.getenv("MYSQL_USER", "root"),
+            password=password or os.getenv("MYSQL_PASSWORD", "root"),
+            database=database or os.getenv("MYSQL_DB", "apppulse_apps"),
+        )
+
+    def connect(self):
+        import mysql.connector  # only needed when MySQL is actually the source
+        try:
+            self.connection = mysql.connector.connect(**self.params)
+        except mysql.connector.Error as e:
+            raise ConnectorError(f"MySQL connection failed: {e}") from e
+        return self
+
+    def close(self):
+        if self.connection is not None and self.connection.is_connected():
+            self.connection.close()
+        self.connection = None
+
+
+class EmbeddedConnector(_SQLConnector):
+    """In-process SQLite file: the full pipeline runs without the docker-compose services."""
+
+    name = "Embedded (SQLite)"
+    placeholder = "?"
+
+    def __init__(self, db_path=EMBEDDED_DB_PATH):
+        super().__init__()
+        self.db_path = db_path
+
+    def connect(self):
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.connection = sqlite3.connect(self.db_path)
+        return self
+
+
+class MongoConnector(SourceConnector):
+    name = "MongoDB"
+
+    def __init__(self, host=None, port=None, database=None):
+        self.host = host or os.getenv("MONGO_HOST", "mongo_db")
+        self.port = int(port or os.getenv("MONGO_PORT", 27017))
+        self.database = database or os.getenv("MONGO_DB", "apppulse_reviews")
+        self.client = None
+
+    def connect(self):
+        from pymongo import MongoClient  # only needed when MongoDB is actually the source
+        from pymongo.errors import PyMongoError
+        try:
+            self.client = MongoClient(host=self.host, port=self.port, serverSelectionTimeoutMS=5000)
+            self.client.admin.command('ping')  # Force connection check
+        except PyMongoError as e:
+            raise ConnectorError(f"MongoDB connection failed: {e}") from e
+        return self
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+    def load(self, table, df, schema=None):
+        collection = self.client[self.database][table]
+        collection.delete_many({})
+        records = df.to_dict(orient="records")
+        if records:
+            collection.insert_many(records)
+        return len(records)
+
+    def extract(self, table):
+        documents = list(self.client[self.database][table].find({}, {"_id": 0}))
+        return pd.DataFrame(documents)
+
+
+class DirectConnector(SourceConnector):
+    """File -> warehouse fast path: keeps the frame in memory instead of round-tripping a store.
+
+    Use it when the operational stores are not the source of truth; the seed is then written
+    straight from the cleaned CSV data.
+    """
+
+    name = "Direct (no operational store)"
+
+    def __init__(self):
+        self.tables = {}
+
+    def load(self, table, df, schema=None):
+        self.tables[table] = df[list(schema)] if schema else df
+        return len(df)
+
+    def extract(self, table):
+        return self.tables.get(table, pd.DataFrame()).copy()
+
+
+CONNECTORS = {
+    "mysql": MySQLConnector,
+    "mongo": MongoConnector,
+    "embedded": EmbeddedConnector,
+    "direct": DirectConnector,
+}
+
+
+def get_connector(kind):
+    """Builds the connector registered under `kind` (mysql, mongo, embedded, direct)."""
+    try:
+        return CONNECTORS[kind.lower()]()
+    except KeyError:
+        raise ConnectorError(f"Unknown connector '{kind}'. Choose one of: {', '.join(CONNECTORS)}") from None
@@ -0,0 +1,80 @@
+import os
+import sys
+
+import duckdb
+
+# ------------------------------------------------------------------- #
+# DuckDB execution profile per workload class (Using Env Vars)
+#   batch       -> dbt builds and pipeline stages: most cores, larger memory cap, no insertion-order tracking
+#   interactive -> dashboard / CLI reads: a few cores and a small cap, so they never starve a running build
+# Every setting can be overridden with DUCKDB_<WORKLOAD>_<SETTING>, e.g. DUCKDB_BATCH_MEMORY_LIMIT=8GB
+# ------------------------------------------------------------------- #
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMP_ROOT = os.getenv("DUCKDB_TEMP_DIRECTORY", os.path.join(PROJECT_ROOT, "warehouse", "tmp"))
+CPU_COUNT = os.cpu_count() or 1
+
+WORKLOAD_DEFAULTS = {
+    "batch": {
+        "threads": max(1, CPU_COUNT - 1),
+        "memory_limit": "4GB",
+        "max_temp_directory_size": "50GB",
+        "preserve_insertion_order": False,
+    },
+    "interactive": {
+        "threads": max(1, CPU_COUNT // 4),
+        "memory_limit": "1GB",
+        "max_temp_directory_size": "10GB",
+        "preserve_insertion_order": True,
+    },
+}
+
+
+def _parse_bool(value):
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+def execution_settings(workload):
+    """Resolved DuckDB settings for a workload class: defaults overridden by DUCKDB_<WORKLOAD>_<SETTING> env vars."""
+    if workload not in WORKLOAD_DEFAULTS:
+        raise ValueError(f"Unknown DuckDB workload '{workload}'. Choose one of: {', '.join(WORKLOAD_DEFAULTS)}")
+
+    settings = {}
+    for name, default in WORKLOAD_DEFAULTS[workload].items():
+        value = os.getenv(f"DUCKDB_{workload.upper()}_{name.upper()}", default)
+        if isinstance(default, bool):
+            value = _parse_bool(value)
+        elif isinstance(default, int):
+            value = int(value)
+        settings[name] = value
+    # Spill files go to a per-workload directory so a build's spill never fills the dashboard's
+    settings["temp_directory"] = os.getenv(f"DUCKDB_{workload.upper()}_TEMP_DIRECTORY", os.path.join(TEMP_ROOT, workload))
+    return settings
+
+
+def connect(database, workload="interactive", read_only=False):
+    """Opens a DuckDB connection with the workload's thread count, memory cap and spill directory applied."""
+    settings = execution_settings(workload)
+    os.makedirs(settings["temp_directory"], exist_ok=True)
+    return duckdb.connect(database=database, read_only=read_only, config=settings)
+
+
+def dbt_env(workload="batch", base_env=None):
+    """Environment for a dbt subprocess: profiles.yml reads these into the dbt-duckdb `settings` block."""
+    env = dict(os.environ if base_env is None else base_env)
+    settings = execution_settings(workload)
+    for name, value in settings.items():
+        env[f"DUCKDB_{workload.upper()}_{name.upper()}"] = str(value).lower() if isinstance(value, bool) else str(value)
+    os.makedirs(settings["temp_directory"], exist_ok=True)
+    return env
+
+
+if __name__ == "__main__":
+    # Prints shell exports for the workload, e.g. in the DAG: eval "$(python duckdb_profile.py batch)"
+    workload = sys.argv[1] if len(sys.argv) > 1 else "batch"
+    try:
+        env = dbt_env(workload, base_env={})
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    for key, value in sorted(env.items()):
+        print(f'export {key}="{value}"')
@@ -0,0 +1,281 @@
+import os
+import sys
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from duckdb_profile import connect as connect_duckdb
+
+# --- Sketch Configuration ---
+HLL_PRECISION = 14  # 2^14 registers (16 KB per category), ~0.8% standard error on distinct counts
+HLL_REGISTERS = 1 << HLL_PRECISION
+RATING_MIN, RATING_MAX, RATING_STEP = 0.0, 5.0, 0.01  # rating histogram: ratings are snapped to RATING_STEP
+RATING_BINS = int(round((RATING_MAX - RATING_MIN) / RATING_STEP)) + 1
+
+# --- File Paths ---
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.getenv("WAREHOUSE_PATH", os.path.join(PROJECT_ROOT, "warehouse", "apppulse.duckdb"))
+SKETCH_TABLE = "main.kpi_category_sketches"
+LEDGER_TABLE = "main.kpi_sketch_ledger"  # row hash -> how many such stg_apps rows are folded into the sketches
+
+# Every stg_apps row, as the exact KPIs see it (no deduplication). row_hash covers everything a sketch
+# measures, so an edited rating or installs value looks like a removed row plus a new one.
+KPI_ROWS_QUERY = """
+    SELECT
+        md5(coalesce(source_unique_key, '_') || '|' || coalesce(app_name, '_') || '|'
+            || coalesce(cast(app_rating AS VARCHAR), '_') || '|' || coalesce(cast(installs_int AS VARCHAR), '_')) AS row_hash,
+        COALESCE(app_category, 'UNKNOWN') AS category,
+        app_name,
+        app_rating,
+        installs_int
+    FROM main.stg_apps
+"""
+
+
+# ------------------------------------------------------------------- #
+# Sketch primitives (all mergeable, constant size per category)
+# ------------------------------------------------------------------- #
+def _hash64(values):
+    """Deterministic 64-bit hashes, vectorized (pandas' hash uses a fixed key, so it is stable across runs)."""
+    return pd.util.hash_pandas_object(pd.Series(values, dtype="object"), index=False).to_numpy(dtype=np.uint64)
+
+
+def _leading_zeros64(x):
+    """Vectorized count of leading zero bits of uint64 values (binary search over the bit width)."""
+    x = x.copy()
+    zeros = np.zeros(x.shape, dtype=np.uint8)
+    for bits in (32, 16, 8, 4, 2, 1):
+        mask = x < (np.uint64(1) << np.uint64(64 - bits))
+        zeros[mask] += bits
+        x[mask] <<= np.uint64(bits)
+    zeros[x == 0] += 1  # x == 0 stops one short of 64
+    return zeros
+
+
+def hll_registers(values):
+    """HyperLogLog registers for a batch of values."""
+    registers = np.zeros(HLL_REGISTERS, dtype=np.uint8)
+    if len(values) == 0:
+        return registers
+    hashes = _hash64(values)
+    index = (hashes >> np.uint64(64 - HLL_PRECISION)).astype(np.int64)
+    rest = hashes << np.uint64(HLL_PRECISION)
+    rank = np.minimum(_leading_zeros64(rest) + 1, 64 - HLL_PRECISION + 1).astype(np.uint8)
+    np.maximum.at(registers, index, rank)
+    return registers
+
+
+def hll_estimate(registers):
+    """Cardinality estimate with the standard small-range (linear counting) correction."""
+    m = float(len(registers))
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.power(2.0, -registers.astype(np.float64)))
+    empty = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and empty:
+        estimate = m * np.log(m / empty)
+    return int(round(estimate))
+
+
+def rating_histogram(ratings):
+    """Fixed-resolution histogram over the rating domain: mergeable, each rating snapped to the nearest RATING_STEP."""
+    ratings = pd.to_numeric(pd.Series(ratings), errors="coerce").dropna().clip(RATING_MIN, RATING_MAX)
+    bins = np.rint((ratings.to_numpy() - RATING_MIN) / RATING_STEP).astype(np.int64)
+    return np.bincount(bins, minlength=RATING_BINS).astype(np.int64)
+
+
+def histogram_quantile(histogram, q):
+    """Quantile with pandas' default linear interpolation between the two nearest ranks.
+
+    Equals Series.quantile(q) for ratings on the RATING_STEP grid (the source has one decimal);
+    other ratings are off by at most RATING_STEP / 2.
+    """
+    total = int(histogram.sum())
+    if total == 0:
+        return None
+    rank = (total - 1) * q
+    lower, upper = int(np.floor(rank)), int(np.ceil(rank))
+    # The k-th smallest value (0-based) sits in the first bin whose cumulative count exceeds k
+    bins = np.searchsorted(np.cumsum(histogram), [lower, upper], side="right")
+    values = RATING_MIN + bins * RATING_STEP
+    return round(float(values[0] + (rank - lower) * (values[1] - values[0])), 6)
+
+
+class CategorySketch:
+    """Mergeable KPI summary for one category (or a union of categories)."""
+
+    def __init__(self, hll=None, histogram=None, rating_sum=0.0, rating_count=0, installs_sum=0, row_count=0):
+        self.hll = hll if hll is not None else np.zeros(HLL_REGISTERS, dtype=np.uint8)
+        self.histogram = histogram if histogram is not None else np.zeros(RATING_BINS, dtype=np.int64)
+        self.rating_sum = float(rating_sum)
+        self.rating_count = int(rating_count)
+        self.installs_sum = int(installs_sum)
+        self.row_count = int(row_count)
+
+    @classmethod
+    def from_frame(cls, df):
+        """Builds a sketch from rows with app_name, app_rating and installs_int columns."""
+        ratings = pd.to_numeric(df["app_rating"], errors="coerce")
+        return cls(
+            hll=hll_registers(df["app_name"].dropna().astype(str).to_numpy()),
+            histogram=rating_histogram(ratings),
+            rating_sum=float(ratings.sum()),
+            rating_count=int(ratings.notna().sum()),
+            installs_sum=int(pd.to_numeric(df["installs_int"], errors="coerce").fillna(0).sum()),
+            row_count=len(df),
+        )
+
+    def merge(self, other):
+        return CategorySketch(
+            hll=np.maximum(self.hll, other.hll),
+            histogram=self.histogram + other.histogram,
+            rating_sum=self.rating_sum + other.rating_sum,
+            rating_count=self.rating_count + other.rating_count,
+            installs_sum=self.installs_sum + other.installs_sum,
+            row_count=self.row_count + other.row_count,
+        )
+
+    @property
+    def distinct_apps(self):
+        return hll_estimate(self.hll)
+
+    @property
+    def avg_rating(self):
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
+    def rating_quantile(self, q):
+        return histogram_quantile(self.histogram, q)
+
+    def to_row(self, category):
+        return (category, self.hll.tobytes(), self.histogram.tobytes(), self.rating_sum,
+                self.rating_count, self.installs_sum, self.row_count)
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(
+            hll=np.frombuffer(row["hll"], dtype=np.uint8).copy(),
+            histogram=np.frombuffer(row["rating_histogram"], dtype=np.int64).copy(),
+            rating_sum=row["rating_sum"],
+            rating_count=row["rating_count"],
+            installs_sum=row["installs_sum"],
+            row_count=row["row_count"],
+        )
+
+
+# ------------------------------------------------------------------- #
+# Warehouse storage
+# ------------------------------------------------------------------- #
+def load_category_sketches(conn):
+    """Reads all stored sketches into {category: CategorySketch}. Empty dict if the table does not exist yet."""
+    try:
+        rows = conn.execute(f"SELECT * FROM {SKETCH_TABLE}").fetchdf()
+    except duckdb.CatalogException:
+        return {}
+    return {row["category"]: CategorySketch.from_row(row) for _, row in rows.iterrows()}
+
+
+def merge_category_sketches(sketches, categories=None):
+    """Union of the given categories (all of them when categories is None)."""
+    selected = sketches.values() if categories is None else (sketches[c] for c in categories if c in sketches)
+    merged = CategorySketch()
+    for sketch in selected:
+        merged = merged.merge(sketch)
+    return merged
+
+
+def load_kpi_rows(conn):
+    """The stg_apps rows the sketches summarize; also the exact fallback when no sketches exist."""
+    return conn.execute(KPI_ROWS_QUERY).fetchdf()
+
+
+def _ensure_tables(conn):
+    ledger_columns = {row[0] for row in conn.execute(
+        "SELECT column_name FROM information_schema.columns WHERE table_schema = 'main' AND table_name = 'kpi_sketch_ledger'"
+    ).fetchall()}
+    if ledger_columns and "row_hash" not in ledger_columns:
+        # Ledger from before rows were tracked by content: start over with a full rebuild
+        conn.execute(f"DROP TABLE {LEDGER_TABLE}")
+        conn.execute(f"DROP TABLE IF EXISTS {SKETCH_TABLE}")
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SKETCH_TABLE} (
+            category VARCHAR PRIMARY KEY,
+            hll BLOB,
+            rating_histogram BLOB,
+            rating_sum DOUBLE,
+            rating_count BIGINT,
+            installs_sum HUGEINT,
+            row_count BIGINT,
+            updated_at TIMESTAMP DEFAULT current_timestamp
+        )
+    """)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {LEDGER_TABLE} (row_hash VARCHAR, category VARCHAR, row_count BIGINT)")
+
+
+def update_kpi_sketches(conn):
+    """Folds new stg_apps rows into the stored per-category sketches.
+
+    The ledger counts the folded rows per (row_hash, category), so duplicate rows are folded
+    as often as they occur, like the exact KPIs. Rows beyond the ledger count are merged in;
+    HyperLogLog cannot subtract, so a category that lost rows (including rows whose rating or
+    installs changed) is rebuilt from its current rows instead. Returns (new_rows, rebuilt_categories).
+    """
+    _ensure_tables(conn)
+    keys = ["row_hash", "category"]
+    current = load_kpi_rows(conn)
+    ledger = conn.execute(f"SELECT row_hash, category, row_count FROM {LEDGER_TABLE}").fetchdf()
+
+    current_counts = current.groupby(keys).size()
+    ledger_counts = ledger.set_index(keys)["row_count"]
+    diff = current_counts.sub(ledger_counts, fill_value=0).astype(int)
+    rebuild = set(diff[diff < 0].index.get_level_values("category"))
+    added = diff[diff > 0]
+
+    # Rows with the same hash are identical in every measured column, so any copies will do
+    distinct_rows = current.drop_duplicates(subset=keys).set_index(keys)
+    delta = distinct_rows.loc[added.index.repeat(added.to_numpy())].reset_index()
+
+    sketches = load_category_sketches(conn)
+    for category, rows in delta[~delta["category"].isin(rebuild)].groupby("category"):
+        sketches[category] = sketches.get(category, CategorySketch()).merge(CategorySketch.from_frame(rows))
+    for category in rebuild:
+        rows = current[current["category"] == category]
+        if rows.empty:
+            sketches.pop(category, None)
+        else:
+            sketches[category] = CategorySketch.from_frame(rows)
+
+    conn.execute("BEGIN TRANSACTION")
+    try:
+        conn.execute(f"DELETE FROM {SKETCH_TABLE}")
+        conn.executemany(
+            f"INSERT INTO {SKETCH_TABLE} (category, hll, rating_histogram, rating_sum, rating_count, installs_sum, row_count) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [sketch.to_row(category) for category, sketch in sketches.items()],
+        )
+        conn.execute(f"DELETE FROM {LEDGER_TABLE}")
+        conn.register("ledger_df", current_counts.rename("row_count").reset_index())
+        conn.execute(f"INSERT INTO {LEDGER_TABLE} SELECT row_hash, category, row_count FROM ledger_df")
+        conn.unregister("ledger_df")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return len(delta), sorted(rebuild)
+
+
+def build_kpi_sketches():
+    print(f"--- تحديث ملخصات الـ KPI (sketches) في: {DB_PATH} ---")
+    conn = connect_duckdb(DB_PATH, workload="batch")
+    try:
+        new_rows, rebuilt = update_kpi_sketches(conn)
+        print(f"✅ تم دمج {new_rows} صف جديد في الـ sketches. فئات أعيد بناؤها: {len(rebuilt)}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    try:
+        build_kpi_sketches()
+    except Exception as e:
+        print(f"❌ حدث خطأ غير متوقع: {e}")
+        sys.exit(1)
@@ -0,0 +1,250 @@
+import os
+import sys
+import sqlite3
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from compressed_io import OUTPUT_COMPRESSION, iter_csv_chunks, compression_for, compressed_path, write_csv
+
+# --- Scoring Configuration (Using Env Vars) ---
+SENTIMENT_WORKERS = int(os.getenv("SENTIMENT_WORKERS", os.cpu_count() or 1))
+SENTIMENT_CHUNK_SIZE = int(os.getenv("SENTIMENT_CHUNK_SIZE", 50000))
+
+# --- File Paths ---
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Optional CSV: word,polarity,subjectivity. Relative paths are anchored to the project root, like the
+# stage cache fingerprint (the Airflow BashOperator runs from a temp directory)
+SENTIMENT_LEXICON_PATH = os.getenv("SENTIMENT_LEXICON_PATH")
+if SENTIMENT_LEXICON_PATH:
+    SENTIMENT_LEXICON_PATH = os.path.join(PROJECT_ROOT, SENTIMENT_LEXICON_PATH)
+SCORE_CACHE_PATH = os.getenv("SENTIMENT_CACHE_PATH", os.path.join(PROJECT_ROOT, "warehouse", "sentiment_cache.sqlite"))
+DBT_SEED_PATH = os.path.join(PROJECT_ROOT, "app_dbt", "seeds", "reviews_from_mongo.csv")
+
+TEXT_COLUMN = "Translated_Review"
+SCORE_COLUMNS = ["Sentiment", "Sentiment_Polarity", "Sentiment_Subjectivity"]
+
+# Bump when the scoring rules change; lexicon edits are picked up by LEXICON_DIGEST
+SCORER_VERSION = "1"
+
+# ------------------------------------------------------------------- #
+# Lexicon (word -> (polarity, subjectivity)), same scale as the source data: [-1, 1] and [0, 1]
+# ------------------------------------------------------------------- #
+BASE_LEXICON = {
+    "good": (0.7, 0.6), "great": (0.8, 0.75), "excellent": (1.0, 1.0), "amazing": (0.6, 0.9),
+    "awesome": (1.0, 1.0), "best": (1.0, 0.3), "better": (0.5, 0.5), "love": (0.5, 0.6),
+    "loved": (0.7, 0.8), "like": (0.2, 0.3), "nice": (0.6, 1.0), "perfect": (1.0, 1.0),
+    "fantastic": (0.4, 0.9), "wonderful": (1.0, 1.0), "beautiful": (0.85, 1.0), "cool": (0.35, 0.65),
+    "fun": (0.3, 0.2), "easy": (0.43, 0.83), "useful": (0.3, 0.0), "helpful": (0.5, 0.5),
+    "happy": (0.8, 1.0), "recommend": (0.4, 0.5), "smooth": (0.4, 0.6), "fast": (0.2, 0.6),
+    "simple": (0.0, 0.36), "free": (0.4, 0.8), "thanks": (0.2, 0.2), "enjoy": (0.4, 0.5),
+    "favorite": (0.5, 1.0), "works": (0.1, 0.2), "bad": (-0.7, 0.67), "worst": (-1.0, 1.0),
+    "worse": (-0.4, 0.6), "terrible": (-1.0, 1.0), "horrible": (-1.0, 1.0), "awful": (-1.0, 1.0),
+    "poor": (-0.4, 0.6), "hate": (-0.8, 0.9), "useless": (-0.5, 0.0), "annoying": (-0.8, 0.9),
+    "boring": (-1.0, 1.0), "slow": (-0.3, 0.39), "crash": (-0.5, 0.5), "crashes": (-0.5, 0.5),
+    "bug": (-0.4, 0.4), "bugs": (-0.4, 0.4), "broken": (-0.4, 0.4), "problem": (-0.3, 0.3),
+    "problems": (-0.3, 0.3), "issue": (-0.2, 0.3), "waste": (-0.2, 0.0), "stupid": (-0.8, 1.0),
+    "wrong": (-0.5, 0.9), "difficult": (-0.5, 1.0), "hard": (-0.3, 0.54), "disappointed": (-0.75, 0.75),
+    "fake": (-0.5, 1.0), "scam": (-0.8, 0.8), "ads": (-0.1, 0.2), "expensive": (-0.5, 0.7),
+    "unable": (-0.5, 0.5), "fix": (-0.1, 0.1), "sucks": (-0.3, 0.3), "fail": (-0.5, 0.5),
+}
+
+# Negators flip and dampen the following word; intensifiers scale it (TextBlob-style rules)
+NEGATIONS = {"not", "no", "never", "don't", "doesn't", "didn't", "isn't", "wasn't", "can't", "won't", "cannot"}
+INTENSIFIERS = {"very": 1.3, "really": 1.3, "so": 1.2, "extremely": 1.5, "too": 1.2, "super": 1.4, "totally": 1.3}
+
+
+def _load_lexicon():
+    """Returns the lexicon as two Series (indexed by word) for vectorized lookups."""
+    lexicon = dict(BASE_LEXICON)
+    if SENTIMENT_LEXICON_PATH and os.path.exists(SENTIMENT_LEXICON_PATH):
+        extra = pd.read_csv(SENTIMENT_LEXICON_PATH)
+        for row in extra.itertuples(index=False):
+            lexicon[str(row.word).lower()] = (float(row.polarity), float(row.subjectivity))
+    words = sorted(lexicon)
+    polarity = pd.Series([lexicon[w][0] for w in words], index=words, dtype="float64")
+    subjectivity = pd.Series([lexicon[w][1] for w in words], index=words, dtype="float64")
+    return polarity, subjectivity
+
+
+def _lexicon_digest():
+    """Digest of the effective lexicon (base + SENTIMENT_LEXICON_PATH) and the rule words."""
+    content = pd.DataFrame({"polarity": LEXICON_POLARITY, "subjectivity": LEXICON_SUBJECTIVITY}).to_csv()
+    content += f"{sorted(NEGATIONS)}\n{sorted(INTENSIFIERS.items())}"
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
+
+
+LEXICON_POLARITY, LEXICON_SUBJECTIVITY = _load_lexicon()
+INTENSIFIER_SERIES = pd.Series(INTENSIFIERS, dtype="float64")
+LEXICON_DIGEST = _lexicon_digest()
+
+
+# ------------------------------------------------------------------- #
+# Vectorized scorer
+# ------------------------------------------------------------------- #
+def polarity_to_label(polarity):
+    """Maps polarity scores to the Positive / Negative / Neutral labels used in the source data."""
+    return np.select([polarity > 0, polarity < 0], ["Positive", "Negative"], default="Neutral")
+
+
+def score_texts(texts):
+    """Scores a batch of review texts at once. Returns a DataFrame of polarity, subjectivity and label."""
+    texts = pd.Series(texts, dtype="object").reset_index(drop=True)
+    tokens = texts.fillna("").astype(str).str.lower().str.findall(r"[a-z']+").explode()
+
+    # Every token keeps the row index of its review, so all rules are column operations
+    previous = tokens.groupby(level=0).shift(1)
+    polarity = tokens.map(LEXICON_POLARITY)
+    subjectivity = tokens.map(LEXICON_SUBJECTIVITY)
+    multiplier = previous.map(INTENSIFIER_SERIES).fillna(1.0)
+    polarity = (polarity * multiplier).clip(-1.0, 1.0)
+    subjectivity = (subjectivity * multiplier).clip(0.0, 1.0)
+    polarity = polarity.where(~previous.isin(NEGATIONS), polarity * -0.5)
+
+    hits = pd.DataFrame({"polarity": polarity, "subjectivity": subjectivity}).dropna()
+    means = hits.groupby(level=0).mean().reindex(texts.index, fill_value=0.0)
+
+    result = pd.DataFrame({
+        "Sentiment_Polarity": means["polarity"].round(6).to_numpy(),
+        "Sentiment_Subjectivity": means["subjectivity"].round(6).to_numpy(),
+    })
+    result["Sentiment"] = polarity_to_label(result["Sentiment_Polarity"].to_numpy())
+    return result
+
+
+def _score_chunk(texts):
+    """Worker entry point for the process pool (must be a top-level function to be picklable)."""
+    return score_texts(texts)
+
+
+def score_texts_parallel(texts):
+    """Splits the texts into chunks and scores them across a process pool."""
+    texts = list(texts)
+    if not texts:
+        return pd.DataFrame(columns=["Sentiment_Polarity", "Sentiment_Subjectivity", "Sentiment"])
+
+    chunks = [texts[i:i + SENTIMENT_CHUNK_SIZE] for i in range(0, len(texts), SENTIMENT_CHUNK_SIZE)]
+    if len(chunks) == 1 or SENTIMENT_WORKERS <= 1:
+        # Not worth the pool start-up cost
+        return pd.concat([score_texts(chunk) for chunk in chunks], ignore_index=True)
+
+    with ProcessPoolExecutor(max_workers=min(SENTIMENT_WORKERS, len(chunks))) as executor:
+        return pd.concat(executor.map(_score_chunk, chunks), ignore_index=True)
+
+
+# ------------------------------------------------------------------- #
+# Score cache (review hash -> scores), so a review is never scored twice
+# ------------------------------------------------------------------- #
+def review_hash(text):
+    return hashlib.sha1(f"{SCORER_VERSION}:{LEXICON_DIGEST}\n{text}".encode("utf-8")).hexdigest()
+
+
+def _open_cache():
+    os.makedirs(os.path.dirname(SCORE_CACHE_PATH), exist_ok=True)
+    conn = sqlite3.connect(SCORE_CACHE_PATH)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS review_scores (
+            review_hash TEXT PRIMARY KEY,
+            polarity REAL,
+            subjectivity REAL,
+            label TEXT
+        )
+    """)
+    return conn
+
+
+def _lookup_cached(conn, hashes):
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (review_hash TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM wanted")
+    conn.executemany("INSERT OR IGNORE INTO wanted VALUES (?)", ((h,) for h in hashes))
+    rows = conn.execute("""
+        SELECT s.review_hash, s.polarity, s.subjectivity, s.label
+        FROM review_scores s JOIN wanted w ON s.review_hash = w.review_hash
+    """).fetchall()
+    return pd.DataFrame(rows, columns=["review_hash", "Sentiment_Polarity", "Sentiment_Subjectivity", "Sentiment"])
+
+
+def score_missing_sentiment(df):
+    """Fills missing Sentiment / Sentiment_Polarity / Sentiment_Subjectivity values in place.
+
+    Only reviews that are missing at least one of the three are considered, already
+    known review hashes are read from the cache, and the rest are scored in parallel.
+    Returns the number of reviews that had to be scored (cache misses).
+    """
+    for col in SCORE_COLUMNS:
+        if col not in df.columns:
+            df[col] = np.nan
+    # A chunk whose labels are all missing is read as float64, which cannot hold the label strings
+    df["Sentiment"] = df["Sentiment"].astype("object")
+    missing_mask = df[SCORE_COLUMNS].isna().any(axis=1) & df[TEXT_COLUMN].notna()
+    if not missing_mask.any():
+        return 0
+
+    texts = df.loc[missing_mask, TEXT_COLUMN].astype(str)
+    hashes = texts.map(review_hash)
+    unique_hashes = hashes.drop_duplicates()
+
+    conn = _open_cache()
+    try:
+        cached = _lookup_cached(conn, unique_hashes.tolist())
+        to_score = unique_hashes[~unique_hashes.isin(cached["review_hash"])]
+        scored = score_texts_parallel(texts.loc[to_score.index].tolist())
+        scored.insert(0, "review_hash", to_score.to_numpy())
+        if not scored.empty:
+            conn.executemany(
+                "INSERT OR REPLACE INTO review_scores VALUES (?, ?, ?, ?)",
+                scored[["review_hash", "Sentiment_Polarity", "Sentiment_Subjectivity", "Sentiment"]]
+                .itertuples(index=False, name=None),
+            )
+            conn.commit()
+    finally:
+        conn.close()
+
+    scores = pd.concat([cached, scored], ignore_index=True).set_index("review_hash")
+    scores = scores.astype({"Sentiment_Polarity": "float64", "Sentiment_Subjectivity": "float64"})
+    for col in SCORE_COLUMNS:
+        # Keep the labels that came with the source data; only fill the gaps
+        df.loc[missing_mask, col] = df.loc[missing_mask, col].fillna(hashes.map(scores[col]))
+    return len(scored)
+
+
+def score_seed_file(seed_path=DBT_SEED_PATH, output_path=None):
+    """Re-scores an existing reviews file chunk by chunk (standalone stage).
+
+    Without output_path the file is rewritten in place with its own compression (gzip/zstd
+    review extracts stay compressed). With output_path the scored reviews are written there,
+    compressed according to OUTPUT_COMPRESSION (e.g. reviews_scored.csv -> reviews_scored.csv.zst).
+    """
+    if output_path is None:
+        out_path, compression = seed_path, compression_for(seed_path)
+    else:
+        out_path, compression = compressed_path(output_path, OUTPUT_COMPRESSION), OUTPUT_COMPRESSION
+    # Temp name keeps the extension, so write_csv does not append another one
+    tmp_path = os.path.join(os.path.dirname(out_path), ".tmp-" + os.path.basename(out_path))
+
+    print(f"📥 جاري تقييم المراجعات غير المصنفة في: {seed_path}...")
+    total_rows, total_scored = 0, 0
+    header = True
+    for chunk in iter_csv_chunks(seed_path, chunksize=SENTIMENT_CHUNK_SIZE * max(SENTIMENT_WORKERS, 1)):
+        total_scored += score_missing_sentiment(chunk)
+        total_rows += len(chunk)
+        write_csv(chunk, tmp_path, compression=compression, index=False, na_rep='NULL',
+                  mode="w" if header else "a", header=header)
+        header = False
+    if header:
+        print("⚠️ Seed file is empty, nothing to score.")
+        return
+    os.replace(tmp_path, out_path)
+    print(f"✅ تم تقييم {total_scored} مراجعة جديدة من أصل {total_rows} صف. الناتج في: {out_path}")
+
+
+if __name__ == "__main__":
+    # Usage: score_review_sentiment.py [input.csv[.gz|.zst]] [output.csv]
+    try:
+        score_seed_file(sys.argv[1] if len(sys.argv) > 1 else DBT_SEED_PATH,
+                        sys.argv[2] if len(sys.argv) > 2 else None)
+    except FileNotFoundError as e:
+        print(f"❌ خطأ: لم يتم العثور على الملف: {e}")
+        sys.exit(1)
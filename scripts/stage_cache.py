@@ -0,0 +1,366 @@
+import os
+import sys
+import json
+import glob
+import shutil
+import uuid
+import hashlib
+import argparse
+import tempfile
+import contextlib
+import subprocess
+
+try:
+    import fcntl
+except ImportError:  # Windows (run_pipeline.py)
+    fcntl = None
+    import msvcrt
+
+# --- File Paths ---
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.getenv("STAGE_CACHE_DIR", os.path.join(PROJECT_ROOT, "warehouse", ".stage_cache"))
+STATE_FILE = os.path.join(CACHE_DIR, "stages.json")
+FILE_HASH_INDEX = os.path.join(CACHE_DIR, "file_hashes.json")
+LOCK_FILE = os.path.join(CACHE_DIR, ".lock")  # guards both JSON files; the DAG runs ingest stages in parallel
+DBT_STATE_DIR = os.path.join(CACHE_DIR, "dbt_state")
+DBT_PROJECT_DIR = os.path.join(PROJECT_ROOT, "app_dbt")
+
+# Set STAGE_CACHE_DISABLED=1 to force every stage to run (e.g. after a manual warehouse reset)
+CACHE_DISABLED = os.getenv("STAGE_CACHE_DISABLED", "0") == "1"
+
+# Bump this when the fingerprint recipe itself changes so old entries are invalidated
+FINGERPRINT_VERSION = "1"
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# ------------------------------------------------------------------- #
+# تعريف المراحل: المدخلات (ملفات / globs نسبية لجذر المشروع)، متغيرات البيئة، المراحل السابقة (after)، والمخرجات
+# ------------------------------------------------------------------- #
+STAGES = {
+    "ingest_apps": {
+        "inputs": [
+            "data/google_play_apps.csv",
+            "data/archive.zip",
+            "scripts/ingest_apps_to_mysql.py",
+            ".env",  # the ingest scripts load their connector/source settings from it
+            "scripts/compressed_io.py",
+            "scripts/connectors.py",
+        ],
+        "env": ["MYSQL_HOST", "MYSQL_USER", "MYSQL_DB", "APPS_SOURCE_PATH", "SOURCE_CONNECTOR", "APPS_CONNECTOR"],
+        "outputs": ["app_dbt/seeds/apps_from_mysql.csv"],
+    },
+    "ingest_reviews": {
+        "inputs": [
+            "data/googleplaystore_user_reviews.csv",
+            "data/archive.zip",
+            "scripts/ingest_reviews_to_mongodb.py",
+            ".env",
+            "scripts/score_review_sentiment.py",
+            "scripts/compressed_io.py",
+            "scripts/connectors.py",
+        ],
+        "env": ["MONGO_HOST", "MONGO_PORT", "MONGO_DB", "SENTIMENT_LEXICON_PATH", "REVIEWS_SOURCE_PATH",
+                "SOURCE_CONNECTOR", "REVIEWS_CONNECTOR"],
+        # Files named by env vars: their contents are hashed too, not just the path. Relative paths
+        # resolve against PROJECT_ROOT, as in score_review_sentiment.py
+        "env_inputs": ["SENTIMENT_LEXICON_PATH"],
+        "outputs": ["app_dbt/seeds/reviews_from_mongo.csv"],
+    },
+    "build_app_name_index": {
+        "inputs": [
+            "app_dbt/seeds/apps_from_mysql.csv",
+            "app_dbt/seeds/reviews_from_mongo.csv",
+            "scripts/build_app_name_index.py",
+        ],
+        "env": ["APP_NAME_FUZZY_CUTOFF", "APP_NAME_FUZZY_MAX_CANDIDATES"],
+        "outputs": ["app_dbt/seeds/app_name_index.csv"],
+    },
+    "dbt_build": {
+        "inputs": [
+            "app_dbt/dbt_project.yml",
+            "app_dbt/profiles.yml",
+            "app_dbt/models/**/*.sql",
+            "app_dbt/models/**/*.yml",
+            "app_dbt/macros/**/*.sql",
+            "app_dbt/seeds/*.csv",
+        ],
+        "env": [],
+        "outputs": ["warehouse/apppulse.duckdb"],
+    },
+    "build_kpi_sketches": {
+        # Sketches are folded from stg_apps, which depends only on the apps seed and its model
+        "inputs": [
+            "app_dbt/seeds/apps_from_mysql.csv",
+            "app_dbt/models/staging/stg_apps.sql",
+            "scripts/kpi_sketches.py",
+        ],
+        "env": ["WAREHOUSE_PATH"],
+        # The sketch table lives in the warehouse dbt rebuilds, so every dbt_build run invalidates it
+        "after": ["dbt_build"],
+        "outputs": ["warehouse/apppulse.duckdb"],
+    },
+}
+
+
+# ------------------------------------------------------------------- #
+# Hashing helpers
+# ------------------------------------------------------------------- #
+def _load_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Unique temp file per writer, then an atomic replace, so a crash never leaves a half-written state file
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=os.path.dirname(path),
+                                     prefix=os.path.basename(path) + ".", suffix=".tmp", delete=False) as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    try:
+        os.replace(f.name, path)
+    except OSError:
+        os.remove(f.name)
+        raise
+
+
+@contextlib.contextmanager
+def _state_lock():
+    """Exclusive lock around a read-modify-write of the cache's JSON files."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(LOCK_FILE, "a+") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        else:
+            lock.seek(0)
+            msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _update_json(path, updates):
+    """Merges `updates` into the JSON file under the lock, keeping keys written by concurrent stages."""
+    with _state_lock():
+        data = _load_json(path)
+        data.update(updates)
+        _save_json(path, data)
+
+
+def _expand_inputs(patterns):
+    """Expands the stage's input patterns into a sorted list of project-relative file paths."""
+    paths = set()
+    for pattern in patterns:
+        full_pattern = os.path.join(PROJECT_ROOT, pattern)
+        matches = glob.glob(full_pattern, recursive=True)
+        if not matches and not glob.has_magic(pattern):
+            # A missing literal input still has to change the fingerprint
+            paths.add(pattern)
+            continue
+        for match in matches:
+            if os.path.isfile(match):
+                paths.add(os.path.relpath(match, PROJECT_ROOT).replace(os.sep, "/"))
+    return sorted(paths)
+
+
+def hash_file(rel_path, hash_index=None):
+    """Returns the sha256 of a project file, reusing the cached digest when size and mtime are unchanged."""
+    full_path = os.path.join(PROJECT_ROOT, rel_path)
+    try:
+        stat = os.stat(full_path)
+    except FileNotFoundError:
+        return "missing"
+
+    signature = [stat.st_size, stat.st_mtime_ns]
+    if hash_index is not None:
+        cached = hash_index.get(rel_path)
+        if cached and cached.get("signature") == signature:
+            return cached["sha256"]
+
+    digest = hashlib.sha256()
+    with open(full_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    file_hash = digest.hexdigest()
+
+    if hash_index is not None:
+        hash_index[rel_path] = {"signature": signature, "sha256": file_hash}
+    return file_hash
+
+
+def input_hashes(stage_name, hash_index=None):
+    """Returns {project-relative path: sha256} for the stage's input files."""
+    stage = STAGES[stage_name]
+    paths = _expand_inputs(stage["inputs"])
+    paths += [os.getenv(env_name) for env_name in stage.get("env_inputs", []) if os.getenv(env_name)]
+    return {rel_path: hash_file(rel_path, hash_index) for rel_path in paths}
+
+
+def stage_fingerprint(stage_name, hash_index=None):
+    """Computes a content fingerprint over the stage's input files and environment variables."""
+    stage = STAGES[stage_name]
+    digest = hashlib.sha256()
+    digest.update(f"v{FINGERPRINT_VERSION}:{stage_name}\n".encode("utf-8"))
+    for rel_path, file_hash in sorted(input_hashes(stage_name, hash_index).items()):
+        digest.update(f"file:{rel_path}:{file_hash}\n".encode("utf-8"))
+    for env_name in sorted(stage["env"]):
+        digest.update(f"env:{env_name}={os.getenv(env_name, '')}\n".encode("utf-8"))
+    if stage.get("after"):
+        state = _load_json(STATE_FILE)
+        for upstream in stage["after"]:
+            digest.update(f"after:{upstream}:{state.get(upstream, {}).get('run_id', '')}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+# ------------------------------------------------------------------- #
+# Stage state
+# ------------------------------------------------------------------- #
+def is_stage_fresh(stage_name):
+    """True when the stage ran successfully with the same fingerprint and its outputs are still on disk."""
+    if CACHE_DISABLED:
+        return False
+
+    entry = _load_json(STATE_FILE).get(stage_name)
+    if not entry:
+        return False
+
+    hash_index = _load_json(FILE_HASH_INDEX)
+    fingerprint = stage_fingerprint(stage_name, hash_index)
+    _update_json(FILE_HASH_INDEX, hash_index)
+    if entry.get("fingerprint") != fingerprint:
+        return False
+
+    for rel_path in STAGES[stage_name]["outputs"]:
+        if not os.path.exists(os.path.join(PROJECT_ROOT, rel_path)):
+            return False
+    return True
+
+
+def record_stage(stage_name, fingerprint=None):
+    """Stores the stage fingerprint and its output hashes after a successful run."""
+    hash_index = _load_json(FILE_HASH_INDEX)
+    if fingerprint is None:
+        fingerprint = stage_fingerprint(stage_name, hash_index)
+
+    outputs = {}
+    for rel_path in STAGES[stage_name]["outputs"]:
+        # The warehouse is rewritten by several stages, so only its size is recorded
+        full_path = os.path.join(PROJECT_ROOT, rel_path)
+        if rel_path.endswith(".duckdb"):
+            outputs[rel_path] = os.path.getsize(full_path) if os.path.exists(full_path) else None
+        else:
+            outputs[rel_path] = hash_file(rel_path, hash_index)
+
+    # Input digests let dbt_state_args() tell which seeds changed since this run
+    # run_id changes on every successful run, so stages listing this one under "after" rerun too
+    entry = {"fingerprint": fingerprint, "inputs": input_hashes(stage_name, hash_index), "outputs": outputs,
+             "run_id": uuid.uuid4().hex}
+    _update_json(STATE_FILE, {stage_name: entry})
+    _update_json(FILE_HASH_INDEX, hash_index)
+
+
+# ------------------------------------------------------------------- #
+# dbt state selection
+# ------------------------------------------------------------------- #
+def changed_seeds():
+    """Names of the dbt seeds whose content changed since the last recorded dbt_build (None if never recorded)."""
+    entry = _load_json(STATE_FILE).get("dbt_build")
+    if not entry or "inputs" not in entry:
+        return None
+    current = input_hashes("dbt_build", _load_json(FILE_HASH_INDEX))
+    seed_paths = {p for p in set(current) | set(entry["inputs"]) if p.startswith("app_dbt/seeds/") and p.endswith(".csv")}
+    return sorted(os.path.splitext(os.path.basename(p))[0]
+                  for p in seed_paths if current.get(p) != entry["inputs"].get(p))
+
+
+def dbt_state_args():
+    """Returns the dbt selector that rebuilds only modified nodes and their children.
+
+    state:modified compares seeds over 1 MiB by path only, so seeds whose content changed are
+    selected by name (plus their children) alongside it. Falls back to a full build when no
+    previous manifest or seed digests exist or the warehouse is missing, because state
+    selection would otherwise skip nodes that were never built.
+    """
+    manifest_path = os.path.join(DBT_STATE_DIR, "manifest.json")
+    warehouse_path = os.path.join(PROJECT_ROOT, STAGES["dbt_build"]["outputs"][0])
+    if CACHE_DISABLED or not os.path.exists(manifest_path) or not os.path.exists(warehouse_path):
+        return []
+    seeds = changed_seeds()
+    if seeds is None:
+        return []
+    return ["--select", "state:modified+"] + [f"{seed}+" for seed in seeds] + ["--state", DBT_STATE_DIR]
+
+
+def save_dbt_state(dbt_project_dir=DBT_PROJECT_DIR):
+    """Copies the manifest of the last successful dbt run so the next run can compare against it."""
+    manifest_path = os.path.join(dbt_project_dir, "target", "manifest.json")
+    if not os.path.exists(manifest_path):
+        print(f"⚠️ لم يتم العثور على manifest.json في: {manifest_path}")
+        return False
+    os.makedirs(DBT_STATE_DIR, exist_ok=True)
+    shutil.copy2(manifest_path, os.path.join(DBT_STATE_DIR, "manifest.json"))
+    return True
+
+
+# ------------------------------------------------------------------- #
+# CLI (used by the Airflow DAG's BashOperators)
+# ------------------------------------------------------------------- #
+def run_stage(stage_name, command_list, cwd=None):
+    """Runs the command unless the stage is fresh; records the stage only on success."""
+    if is_stage_fresh(stage_name):
+        print(f"⏭️ ... [ SKIPPED ] ... {stage_name} (المدخلات لم تتغير منذ آخر تشغيل ناجح)")
+        return 0
+
+    hash_index = _load_json(FILE_HASH_INDEX)
+    fingerprint = stage_fingerprint(stage_name, hash_index)
+    result = subprocess.run(command_list, cwd=cwd)
+    if result.returncode == 0:
+        record_stage(stage_name, fingerprint)
+    return result.returncode
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Content-addressed cache for AppPulse pipeline stages.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    check_parser = subparsers.add_parser("check", help="Exit 0 if the stage is fresh, 1 otherwise.")
+    check_parser.add_argument("stage", choices=sorted(STAGES))
+
+    record_parser = subparsers.add_parser("record", help="Record a successful run of the stage.")
+    record_parser.add_argument("stage", choices=sorted(STAGES))
+
+    run_parser = subparsers.add_parser("run", help="Run a command for the stage unless it is fresh.")
+    run_parser.add_argument("stage", choices=sorted(STAGES))
+    run_parser.add_argument("cmd", nargs=argparse.REMAINDER, help="Command to run, after '--'.")
+
+    subparsers.add_parser("dbt-args", help="Print the dbt state selection arguments (may be empty).")
+    subparsers.add_parser("save-dbt-state", help="Save the current dbt manifest for the next run.")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "check":
+        return 0 if is_stage_fresh(args.stage) else 1
+    if args.command == "record":
+        record_stage(args.stage)
+        return 0
+    if args.command == "run":
+        cmd = args.cmd[1:] if args.cmd and args.cmd[0] == "--" else args.cmd
+        if not cmd:
+            parser.error("run requires a command after '--'")
+        return run_stage(args.stage, cmd)
+    if args.command == "dbt-args":
+        print(" ".join(dbt_state_args()))
+        return 0
+    if args.command == "save-dbt-state":
+        return 0 if save_dbt_state() else 1
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())